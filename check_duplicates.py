@@ -5,9 +5,11 @@ This script analyzes JSON datasets to find duplicate conversations
 based on intent-level similarity.
 
 Usage:
-    python3 check_sheldon_duplicates.py [dataset.json]
+    python3 check_duplicates.py [dataset.json] [--sample N] [--threshold T]
+                                [--remove] [--jobs N] [--lsh]
     
-    If no file is specified, defaults to 'sheldon.json'
+    If no file is specified, defaults to 'sheldon.json'. When run from a
+    terminal without --sample, the sample size is asked interactively.
 """
 
 import sys
@@ -15,14 +17,44 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 import json
+import time
+import argparse
+import heapq
+from array import array
 from iif import SimilarityScorer
+from iif.lsh import candidate_pairs
 from collections import defaultdict
+from itertools import combinations, compress
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from tqdm import tqdm
+except ImportError:
+    tqdm = None
+
+# Minimum seconds between progress refreshes
+PROGRESS_INTERVAL = 0.5
 
 
 def load_sheldon_dataset(filepath):
-    """Load the Sheldon dataset from JSON."""
-    with open(filepath, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    """Load the Sheldon dataset from JSON (parsed with orjson when installed)."""
+    with open(filepath, 'rb') as f:
+        data = f.read()
+    
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def to_json_bytes(obj):
+    """Serialize to 2-space indented UTF-8 JSON (with orjson when installed)."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
 
 
 def extract_conversations(dataset):
@@ -35,22 +67,32 @@ def extract_conversations(dataset):
         # Extract user and assistant messages
         user_msgs = []
         assistant_msgs = []
+        add_user = user_msgs.append
+        add_assistant = assistant_msgs.append
         
         for msg in messages:
-            role = msg.get('role', '')
-            content = msg.get('content', '')
+            try:
+                role = msg['role']
+                content = msg['content']
+            except KeyError:
+                # Rare malformed message: fall back to empty defaults
+                role = msg.get('role', '')
+                content = msg.get('content', '')
             
             if role == 'user':
-                user_msgs.append(content)
+                add_user(content)
             elif role == 'assistant':
-                assistant_msgs.append(content)
+                add_assistant(content)
+        
+        # Combine into conversation text (each side is joined only once)
+        user_text = ' '.join(user_msgs)
+        assistant_text = ' '.join(assistant_msgs)
         
-        # Combine into conversation text
         conversation = {
             'index': idx,
-            'user': ' '.join(user_msgs),
-            'assistant': ' '.join(assistant_msgs),
-            'full': ' '.join(user_msgs) + ' ' + ' '.join(assistant_msgs)
+            'user': user_text,
+            'assistant': assistant_text,
+            'full': f"{user_text} {assistant_text}"
         }
         
         conversations.append(conversation)
@@ -58,14 +100,117 @@ def extract_conversations(dataset):
     return conversations
 
 
-def find_duplicates(conversations, threshold=0.75, sample_size=None):
+def make_duplicate(conversations, i, j, similarity, verdict, matched_tags):
+    """Build the report entry for a duplicate pair of conversation positions."""
+    return {
+        'index1': conversations[i]['index'],
+        'index2': conversations[j]['index'],
+        'similarity': similarity,
+        'verdict': verdict,
+        'user1': conversations[i]['user'][:100],
+        'user2': conversations[j]['user'][:100],
+        'assistant1': conversations[i]['assistant'][:100],
+        'assistant2': conversations[j]['assistant'][:100],
+        'matched_tags': matched_tags
+    }
+
+
+class DuplicatePairs:
+    """
+    Duplicate pairs stored as parallel arrays of positions and scores.
+    
+    Only (position1, position2, similarity) is kept per pair during the scan;
+    report records with text snippets, verdict and matched tags are built
+    on demand from the conversations when printing or saving.
+    """
+    
+    def __init__(self, conversations, scorer):
+        self.conversations = conversations
+        self.scorer = scorer
+        self.pos1 = array('l')
+        self.pos2 = array('l')
+        self.similarity = array('d')
+        self._features = {}
+    
+    def add(self, pos1, pos2, similarity):
+        """Append a duplicate pair of conversation positions."""
+        self.pos1.append(pos1)
+        self.pos2.append(pos2)
+        self.similarity.append(similarity)
+    
+    def __len__(self):
+        return len(self.similarity)
+    
+    def __iter__(self):
+        for k in range(len(self)):
+            yield self.record(k)
+    
+    def pairs(self):
+        """Yield (index1, index2) dataset indices of each pair."""
+        for pos1, pos2 in zip(self.pos1, self.pos2):
+            yield self.conversations[pos1]['index'], self.conversations[pos2]['index']
+    
+    def record(self, k):
+        """Build the full report entry of the k-th pair."""
+        pos1, pos2 = self.pos1[k], self.pos2[k]
+        
+        result = self.scorer.compare_features(self._preprocess(pos1), self._preprocess(pos2),
+                                              detail_level="summary")
+        
+        return make_duplicate(self.conversations, pos1, pos2, self.similarity[k],
+                              result['verdict'], result['explanation']['matched_tags'])
+    
+    def _preprocess(self, pos):
+        """Preprocess a conversation once, on first use."""
+        if pos not in self._features:
+            self._features[pos] = self.scorer.preprocess(self.conversations[pos]['full'])
+        return self._features[pos]
+
+
+def find_exact_duplicates(conversations):
+    """
+    Group conversations whose text is identical.
+    
+    Identical texts always get identical scores, so each group only needs
+    to be scored once.
+    
+    Args:
+        conversations: List of conversation dictionaries
+        
+    Returns:
+        List of position groups, in order of first occurrence
+    """
+    buckets = defaultdict(list)
+    
+    for pos, conversation in enumerate(conversations):
+        buckets[conversation['full']].append(pos)
+    
+    return list(buckets.values())
+
+
+def find_duplicates(conversations, threshold=0.75, sample_size=None, n_jobs=-1,
+                    use_lsh=False):
     """
     Find duplicate conversations based on similarity.
     
+    Conversations with identical text are grouped and only one
+    representative of each group is scored, against itself (for pairs
+    within the group) and against every other representative. Scores are
+    then expanded to all member pairs, so the result is the same as
+    comparing every pair of conversations.
+    
+    With `use_lsh`, only pairs sharing word shingles (MinHash-LSH) are
+    scored. This loses recall: IIF similarity is based on structure and
+    intent tags, and paraphrased prompts share few shingles, so most
+    paraphrase duplicates are never scored.
+    
     Args:
         conversations: List of conversation dictionaries
         threshold: Similarity threshold (0.0 to 1.0)
         sample_size: If set, only check first N conversations (for testing)
+        n_jobs: Worker processes for scoring pairs (-1 for all CPUs)
+        use_lsh: Only score MinHash-LSH candidate pairs (faster on very large
+            datasets, but misses paraphrased duplicates)
     """
     scorer = SimilarityScorer()
     
@@ -78,43 +223,69 @@ def find_duplicates(conversations, threshold=0.75, sample_size=None):
     
     print(f"🎯 Similarity threshold: {threshold * 100}%\n")
     
-    duplicates = []
-    total_comparisons = len(conversations) * (len(conversations) - 1) // 2
+    duplicates = DuplicatePairs(conversations, scorer)
+    
+    # Identical texts are scored once, through one representative per group
+    groups = find_exact_duplicates(conversations)
+    representatives = [group[0] for group in groups]
+    
+    print(f"🧬 Exactly repeated conversations: {len(conversations) - len(groups):,}")
+    
+    texts = [conversations[pos]['full'] for pos in representatives]
+    all_pairs = len(texts) * (len(texts) - 1) // 2
+    
+    if use_lsh:
+        print("🔗 Indexing conversations with MinHash-LSH...")
+        pairs = candidate_pairs(texts)
+        print(f"⏳ Total comparisons to make: {len(pairs):,} (of {all_pairs:,} pairs)")
+    else:
+        pairs = list(combinations(range(len(texts)), 2))
+        print(f"⏳ Total comparisons to make: {len(pairs):,}")
+    
+    # A group with repeats also pairs with itself
+    pairs += [(k, k) for k, group in enumerate(groups) if len(group) > 1]
+    total_comparisons = len(pairs)
     
-    print(f"⏳ Total comparisons to make: {total_comparisons:,}")
     print("🔍 Checking for duplicates...\n")
     
-    # Progress tracking
-    checked = 0
+    if tqdm is not None:
+        progress_bar = tqdm(total=total_comparisons, unit='pair',
+                            mininterval=PROGRESS_INTERVAL, smoothing=0.1)
+        
+        def report_progress(checked, total):
+            progress_bar.update(checked - progress_bar.n)
+    else:
+        progress_bar = None
+        last_report = [0.0]
+        
+        def report_progress(checked, total):
+            # Throttle terminal writes to one per PROGRESS_INTERVAL
+            now = time.monotonic()
+            if now - last_report[0] >= PROGRESS_INTERVAL:
+                last_report[0] = now
+                print(f"  Checked {checked:,}/{total:,} pairs...", end='\r')
+    
+    results = scorer.find_similar(texts, threshold=threshold, pairs=pairs,
+                                  progress=report_progress, n_jobs=n_jobs,
+                                  scores_only=True)
+    
+    # Expand representative scores to every pair of group members
+    found = []
+    for i, j, similarity in results:
+        if i == j:
+            member_pairs = combinations(groups[i], 2)
+        else:
+            member_pairs = ((min(p, q), max(p, q)) for p in groups[i] for q in groups[j])
+        found.extend((pos1, pos2, similarity) for pos1, pos2 in member_pairs)
     
-    for i in range(len(conversations)):
-        for j in range(i + 1, len(conversations)):
-            # Compare full conversation text
-            result = scorer.compare(
-                conversations[i]['full'],
-                conversations[j]['full']
-            )
-            
-            checked += 1
-            
-            # Progress indicator every 100 comparisons
-            if checked % 100 == 0:
-                print(f"  Checked {checked:,}/{total_comparisons:,} pairs...", end='\r')
-            
-            if result['similarity_score'] >= threshold:
-                duplicates.append({
-                    'index1': conversations[i]['index'],
-                    'index2': conversations[j]['index'],
-                    'similarity': result['similarity_score'],
-                    'verdict': result['verdict'],
-                    'user1': conversations[i]['user'][:100],
-                    'user2': conversations[j]['user'][:100],
-                    'assistant1': conversations[i]['assistant'][:100],
-                    'assistant2': conversations[j]['assistant'][:100],
-                    'matched_tags': result['explanation']['matched_tags']
-                })
-    
-    print(f"  Checked {checked:,}/{total_comparisons:,} pairs... Done!     \n")
+    for pos1, pos2, similarity in sorted(found):
+        duplicates.add(pos1, pos2, similarity)
+    
+    if progress_bar is not None:
+        progress_bar.close()
+        print()
+    else:
+        print(f"  Checked {total_comparisons:,}/{total_comparisons:,} pairs... Done!     \n")
     
     return duplicates
 
@@ -131,21 +302,25 @@ def print_results(duplicates, total_conversations):
     
     print(f"\n⚠️  Found {len(duplicates)} potential duplicate pairs:\n")
     
+    similarities = duplicates.similarity
+    
     # Group by similarity level
-    high_sim = [d for d in duplicates if d['similarity'] >= 0.85]
-    moderate_sim = [d for d in duplicates if 0.75 <= d['similarity'] < 0.85]
+    high_sim = sum(1 for sim in similarities if sim >= 0.85)
+    moderate_sim = sum(1 for sim in similarities if 0.75 <= sim < 0.85)
     
     if high_sim:
-        print(f"🔴 High Similarity (≥85%): {len(high_sim)} pairs")
+        print(f"🔴 High Similarity (≥85%): {high_sim} pairs")
     if moderate_sim:
-        print(f"🟡 Moderate Similarity (75-85%): {len(moderate_sim)} pairs")
+        print(f"🟡 Moderate Similarity (75-85%): {moderate_sim} pairs")
     
     print("\n" + "-" * 70)
     print("Top 10 Duplicates:")
     print("-" * 70)
     
     # Show top 10
-    for idx, dup in enumerate(sorted(duplicates, key=lambda x: x['similarity'], reverse=True)[:10], 1):
+    top = heapq.nlargest(10, range(len(duplicates)), key=similarities.__getitem__)
+    for idx, k in enumerate(top, 1):
+        dup = duplicates.record(k)
         print(f"\n{idx}. Pair ({dup['index1']}, {dup['index2']}): {dup['similarity']:.3f} ({dup['verdict'].replace('_', ' ').title()})")
         print(f"   User 1: {dup['user1']}...")
         print(f"   User 2: {dup['user2']}...")
@@ -158,71 +333,126 @@ def print_results(duplicates, total_conversations):
     print(f"  Total conversations: {total_conversations}")
     print(f"  Duplicate pairs found: {len(duplicates)}")
     print(f"  Duplication rate: {len(duplicates) / (total_conversations * (total_conversations - 1) // 2) * 100:.2f}%")
-    print(f"  Average similarity: {sum(d['similarity'] for d in duplicates) / len(duplicates):.3f}")
+    print(f"  Average similarity: {sum(similarities) / len(similarities):.3f}")
     print()
 
 
 def save_report(duplicates, output_file='sheldon_duplicates_report.json'):
-    """Save detailed report to JSON file."""
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(duplicates, f, indent=2)
+    """
+    Save detailed report to JSON file.
+    
+    Records are built and written one at a time, so the full report
+    never has to be held in memory.
+    """
+    with open(output_file, 'wb') as f:
+        f.write(b'[')
+        count = 0
+        for record in duplicates:
+            f.write(b',\n  ' if count else b'\n  ')
+            f.write(to_json_bytes(record).replace(b'\n', b'\n  '))
+            count += 1
+        f.write(b'\n]' if count else b']')
     print(f"📄 Detailed report saved to: {output_file}\n")
 
 
+class DisjointSet:
+    """Union-find over dataset indices; each set's root is its smallest index."""
+    
+    def __init__(self, size):
+        self.parent = list(range(size))
+    
+    def find(self, x):
+        """Return the root of x's set, halving the path along the way."""
+        parent = self.parent
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+    
+    def union(self, a, b):
+        """Merge the sets containing a and b under the smaller root."""
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a < root_b:
+            self.parent[root_b] = root_a
+        elif root_b < root_a:
+            self.parent[root_a] = root_b
+
+
 def remove_duplicates(dataset, duplicates):
     """
     Remove duplicate entries from dataset.
-    Keeps the first occurrence, removes subsequent duplicates.
+    
+    Duplicate pairs are merged transitively (if A~B and B~C, all three are
+    one group), and only the first occurrence of each group is kept.
     
     Args:
         dataset: Original dataset
-        duplicates: List of duplicate pairs
+        duplicates: DuplicatePairs from find_duplicates
         
     Returns:
         Cleaned dataset and list of removed indices
     """
-    # Collect all indices to remove (keep lower index, remove higher)
-    indices_to_remove = set()
+    groups = DisjointSet(len(dataset))
+    
+    for index1, index2 in duplicates.pairs():
+        groups.union(index1, index2)
     
-    for dup in duplicates:
-        # Always remove the higher index to preserve order
-        indices_to_remove.add(max(dup['index1'], dup['index2']))
+    # Keep only the lowest index of each group
+    keep = [groups.find(idx) == idx for idx in range(len(dataset))]
     
     # Create cleaned dataset
-    cleaned_dataset = [
-        item for idx, item in enumerate(dataset)
-        if idx not in indices_to_remove
-    ]
+    cleaned_dataset = list(compress(dataset, keep))
+    removed_indices = [idx for idx, kept in enumerate(keep) if not kept]
     
-    return cleaned_dataset, sorted(indices_to_remove)
+    return cleaned_dataset, removed_indices
 
 
 def save_cleaned_dataset(cleaned_dataset, output_file='sheldon_cleaned.json'):
     """Save cleaned dataset to JSON file."""
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(cleaned_dataset, f, indent=2, ensure_ascii=False)
+    with open(output_file, 'wb') as f:
+        f.write(to_json_bytes(cleaned_dataset))
     print(f"✅ Cleaned dataset saved to: {output_file}")
     print(f"   Original entries: {len(cleaned_dataset) + len([])}")
     print(f"   Cleaned entries: {len(cleaned_dataset)}\n")
 
 
+def parse_args(argv=None):
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Find duplicate conversations using the Intent Identity Framework."
+    )
+    parser.add_argument('dataset', nargs='?', default='sheldon.json',
+                        help="Dataset JSON file (default: sheldon.json)")
+    parser.add_argument('--sample', type=int, default=None,
+                        help="Only analyze the first N conversations (0 for all)")
+    parser.add_argument('--threshold', type=float, default=0.75,
+                        help="Similarity threshold (default: 0.75)")
+    parser.add_argument('--remove', action='store_true',
+                        help="Remove duplicates and write a cleaned dataset")
+    parser.add_argument('--jobs', type=int, default=-1,
+                        help="Worker processes for scoring (-1 for all CPUs)")
+    parser.add_argument('--lsh', action='store_true',
+                        help="Only score MinHash-LSH candidate pairs; faster on very "
+                             "large datasets but misses paraphrased duplicates")
+    return parser.parse_args(argv)
+
+
 def main():
     """Main execution."""
+    args = parse_args()
+    interactive = sys.stdin.isatty()
+    
     print("\n" + "=" * 70)
     print("  DATASET DUPLICATE CHECKER")
     print("  Using Intent Identity Framework (IIF)")
     print("=" * 70 + "\n")
     
-    # Get dataset filename from command line or use default
-    if len(sys.argv) > 1:
-        dataset_file = sys.argv[1]
-    else:
-        dataset_file = 'sheldon.json'
+    dataset_file = args.dataset
     
     # Check if file exists
     if not os.path.exists(dataset_file):
         print(f"❌ Error: File '{dataset_file}' not found!")
-        print(f"\nUsage: python3 {sys.argv[0]} [dataset.json]")
+        print(f"\nUsage: python3 {sys.argv[0]} [dataset.json] [--sample N] [--remove]")
         print(f"Example: python3 {sys.argv[0]} mydata.json")
         print(f"\nIf no file is specified, defaults to 'sheldon.json'\n")
         return
@@ -237,21 +467,28 @@ def main():
     conversations = extract_conversations(dataset)
     print(f"✅ Extracted {len(conversations)} conversations\n")
     
-    # Ask user for sample size
-    print("Options:")
-    print("  1. Quick test (first 50 conversations)")
-    print("  2. Medium test (first 200 conversations)")
-    print("  3. Full analysis (all conversations) - This will take time!")
-    
-    choice = input("\nEnter choice (1/2/3) [default: 1]: ").strip() or "1"
-    
-    sample_sizes = {"1": 50, "2": 200, "3": None}
-    sample_size = sample_sizes.get(choice, 50)
-    
-    print()
+    # Sample size from --sample, otherwise ask when run from a terminal
+    if args.sample is not None:
+        sample_size = args.sample or None
+    elif interactive:
+        print("Options:")
+        print("  1. Quick test (first 50 conversations)")
+        print("  2. Medium test (first 200 conversations)")
+        print("  3. Full analysis (all conversations) - This will take time!")
+        
+        choice = input("\nEnter choice (1/2/3) [default: 1]: ").strip() or "1"
+        
+        sample_sizes = {"1": 50, "2": 200, "3": None}
+        sample_size = sample_sizes.get(choice, 50)
+        
+        print()
+    else:
+        sample_size = None
     
     # Find duplicates
-    duplicates = find_duplicates(conversations, threshold=0.75, sample_size=sample_size)
+    duplicates = find_duplicates(conversations, threshold=args.threshold,
+                                 sample_size=sample_size, n_jobs=args.jobs,
+                                 use_lsh=args.lsh)
     
     # Print results
     print_results(duplicates, len(conversations) if not sample_size else sample_size)
@@ -263,17 +500,22 @@ def main():
         report_file = f"{base_name}_duplicates_report.json"
         save_report(duplicates, report_file)
         
-        # Ask if user wants to remove duplicates
-        print("=" * 70)
-        print("  DUPLICATE REMOVAL OPTIONS")
-        print("=" * 70 + "\n")
-        
-        print("What would you like to do?")
-        print("  1. Just show duplicates (already done)")
-        print("  2. Remove duplicates and create cleaned dataset")
-        print("  3. Exit without removing")
-        
-        action = input("\nEnter choice (1/2/3) [default: 1]: ").strip() or "1"
+        # Remove with --remove, otherwise ask when run from a terminal
+        if args.remove:
+            action = "2"
+        elif interactive:
+            print("=" * 70)
+            print("  DUPLICATE REMOVAL OPTIONS")
+            print("=" * 70 + "\n")
+            
+            print("What would you like to do?")
+            print("  1. Just show duplicates (already done)")
+            print("  2. Remove duplicates and create cleaned dataset")
+            print("  3. Exit without removing")
+            
+            action = input("\nEnter choice (1/2/3) [default: 1]: ").strip() or "1"
+        else:
+            action = "1"
         
         if action == "2":
             print("\n🗑️  Removing duplicates...\n")
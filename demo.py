@@ -8,9 +8,16 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from iif import SimilarityScorer
+from functools import lru_cache
 import json
 
 
+@lru_cache(maxsize=None)
+def get_scorer():
+    """Return the scorer shared by all demos (vocabularies load once)."""
+    return SimilarityScorer()
+
+
 def print_separator(title=""):
     """Print a visual separator."""
     if title:
@@ -25,7 +32,7 @@ def demo_similar_prompts():
     """Demo 1: Similar roleplay prompts."""
     print_separator("Demo 1: Similar Roleplay Prompts")
     
-    scorer = SimilarityScorer()
+    scorer = get_scorer()
     
     prompt1 = """
     You are Sheldon Cooper from The Big Bang Theory.
@@ -64,7 +71,7 @@ def demo_different_prompts():
     """Demo 2: Different prompts."""
     print_separator("Demo 2: Different Prompts")
     
-    scorer = SimilarityScorer()
+    scorer = get_scorer()
     
     prompt1 = """
     Write a creative story about a robot learning to feel emotions.
@@ -95,7 +102,7 @@ def demo_batch_processing():
     """Demo 3: Batch processing to find duplicates."""
     print_separator("Demo 3: Batch Duplicate Detection")
     
-    scorer = SimilarityScorer()
+    scorer = get_scorer()
     
     prompts = [
         "You are a helpful AI assistant. Answer questions clearly.",
@@ -132,7 +139,7 @@ def demo_explainability():
     """Demo 4: Explainability features."""
     print_separator("Demo 4: Explainability & Transparency")
     
-    scorer = SimilarityScorer()
+    scorer = get_scorer()
     
     prompt1 = "You are a teacher. Explain concepts clearly with examples."
     prompt2 = "Act as an educator. Use examples to explain ideas."
@@ -28,22 +28,20 @@ def main():
     print(f"Total prompts: {len(prompts)}\n")
     
     # Find all pairs with similarity > 0.65
+    # (each prompt is tagged once; pairs with too little tag overlap are skipped)
     duplicates = []
     
-    for i in range(len(prompts)):
-        for j in range(i + 1, len(prompts)):
-            result = scorer.compare(prompts[i], prompts[j])
-            
-            if result['similarity_score'] >= 0.65:
-                duplicates.append({
-                    'index1': i,
-                    'index2': j,
-                    'prompt1': prompts[i][:50] + "...",
-                    'prompt2': prompts[j][:50] + "...",
-                    'similarity': result['similarity_score'],
-                    'verdict': result['verdict'],
-                    'matched_tags': result['explanation']['matched_tags']
-                })
+    for result in scorer.find_similar(prompts, threshold=0.65):
+        i, j = result['index1'], result['index2']
+        duplicates.append({
+            'index1': i,
+            'index2': j,
+            'prompt1': prompts[i][:50] + "...",
+            'prompt2': prompts[j][:50] + "...",
+            'similarity': result['similarity_score'],
+            'verdict': result['verdict'],
+            'matched_tags': result['explanation']['matched_tags']
+        })
     
     # Display results
     print(f"Found {len(duplicates)} potential duplicates:\n")
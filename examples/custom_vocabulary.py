@@ -19,6 +19,11 @@ def add_custom_tag():
     with open(vocab_path, 'r') as f:
         tags = json.load(f)
     
+    # Only touch the file the first time the example runs
+    if "medical_advice" in tags:
+        print("Custom tag 'medical_advice' is already in the vocabulary.")
+        return
+    
     # Add a new custom tag
     tags["medical_advice"] = {
         "description": "Provides medical or health-related guidance",
@@ -0,0 +1,70 @@
+"""
+Optional compiled numeric kernels.
+
+`cosine` uses the C extension `iif._csim` when it was built, otherwise a
+numba kernel when numba is installed; it is None when neither is available
+and returns None for inputs the compiled kernel cannot take. Callers then
+fall back to their pure-Python or numpy implementations.
+
+numba (and numpy) are imported on the first call rather than here, so
+importing iif stays cheap when no vectors are ever compared.
+"""
+
+import importlib.util
+import math
+
+try:
+    from . import _csim
+except ImportError:
+    _csim = None
+
+
+def _cosine_loop(a, b):
+    """Dot product and both squared norms in a single fused pass."""
+    dot = 0.0
+    squared_a = 0.0
+    squared_b = 0.0
+    for i in range(a.shape[0]):
+        x = a[i]
+        y = b[i]
+        dot += x * y
+        squared_a += x * x
+        squared_b += y * y
+    if squared_a == 0.0 or squared_b == 0.0:
+        return 0.0
+    return dot / (math.sqrt(squared_a) * math.sqrt(squared_b))
+
+
+_numba_cosine = None
+
+
+def _compiled_loop():
+    """JIT-compile `_cosine_loop` on first use."""
+    global _numba_cosine
+    if _numba_cosine is None:
+        from numba import njit
+        _numba_cosine = njit(cache=True, fastmath=True)(_cosine_loop)
+    return _numba_cosine
+
+
+if _csim is not None:
+    def cosine(a, b):
+        """Cosine similarity of two contiguous float32/float64 vectors, or None."""
+        try:
+            return _csim.cosine(a, b)
+        except (TypeError, ValueError, BufferError):
+            # Other dtypes, non-contiguous arrays or non-buffer objects
+            return None
+elif importlib.util.find_spec("numba") is not None:
+    def cosine(a, b):
+        """Cosine similarity of two 1-D float32/float64 arrays of one dtype, or None."""
+        dtype = getattr(a, "dtype", None)
+        if (dtype is None or dtype != getattr(b, "dtype", None) or dtype.kind != "f"
+                or dtype.itemsize not in (4, 8) or a.ndim != 1 or b.ndim != 1):
+            # Other dtypes are left to the numpy fallback rather than cast
+            return None
+        
+        import numpy as np
+        return float(_compiled_loop()(np.ascontiguousarray(a), np.ascontiguousarray(b)))
+else:
+    cosine = None
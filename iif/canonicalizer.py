@@ -5,8 +5,63 @@ Converts prompts and datasets into normalized, structured representations.
 """
 
 import re
-from typing import Dict, List, Any, Optional
-from .utils import normalize_text, extract_keywords, load_vocabulary
+import sys
+from bisect import bisect_right
+from typing import Dict, Iterable, List, Any, Optional
+from .utils import collapse_whitespace, load_vocabulary, KeywordMatcher
+
+# Patterns are compiled once at import instead of on every canonicalize() call
+_ROLE_PATTERNS = tuple(re.compile(p, re.IGNORECASE) for p in (
+    r"act as (?:a |an )?(\w+)",
+    r"you are (?:a |an )?(\w+)",
+    r"pretend to be (?:a |an )?(\w+)",
+    r"role(?:play)? (?:as )?(?:a |an )?(\w+)",
+    r"persona:\s*(\w+)",
+))
+
+_GOAL_PATTERNS = tuple(re.compile(p, re.IGNORECASE) for p in (
+    r"goal:\s*(\w+)",
+    r"objective:\s*(\w+)",
+    r"purpose:\s*(\w+)",
+))
+
+# Constraint keywords that determine a sentence's constraint class, plus the
+# sentence terminators, matched in one scan. The other constraint keywords
+# ("should", "only", ...) never produce a class, so they need no matching.
+_CONSTRAINT_SCAN = re.compile(r'always|never|cannot|must|required|[.!?]')
+
+# Per-sentence precedence: lower rank wins when a sentence has several
+_CONSTRAINT_CLASSES = {
+    "always": (0, "strict_behavior"),
+    "never": (1, "prohibition"),
+    "cannot": (1, "prohibition"),
+    "must": (2, "requirement"),
+    "required": (2, "requirement"),
+}
+_CATCHPHRASE = re.compile(r"catchphrase|signature phrase", re.IGNORECASE)
+
+_COMPLEXITY_SENT = re.compile(r'[.!?]')
+_COMPLEXITY_LF = re.compile(r'\n')
+_COMPLEXITY_STRUCT = re.compile(r'[:\-\*]')
+
+# Category boundaries: a value below bounds[i] falls in labels[i]
+_LENGTH_BOUNDS = (50, 200)
+_LENGTH_LABELS = ("short", "medium", "long")
+_COMPLEXITY_BOUNDS = (5, 15)
+_COMPLEXITY_LABELS = ("simple", "moderate", "complex")
+
+
+def categorize_lengths(word_counts: Iterable[int]) -> List[str]:
+    """
+    Map word counts to length categories ("short", "medium", "long").
+    
+    Args:
+        word_counts: Word count of each text
+        
+    Returns:
+        Length category of each text, as in canonical metadata
+    """
+    return [_LENGTH_LABELS[bisect_right(_LENGTH_BOUNDS, count)] for count in word_counts]
 
 
 class Canonicalizer:
@@ -18,6 +73,18 @@ class Canonicalizer:
         """Initialize the canonicalizer with vocabularies."""
         self.synonyms = load_vocabulary("synonyms")
         self.patterns = load_vocabulary("patterns")
+        
+        # Indicators are matched as given against lowercased text, so the
+        # matcher must not normalize them. Pattern names are interned so
+        # comparisons between canonical forms hit the identity fast path.
+        self._pattern_indicators = [
+            (sys.intern(pattern_name), pattern_data.get("indicators", []))
+            for pattern_name, pattern_data in self.patterns.items()
+        ]
+        self._indicator_matcher = KeywordMatcher(
+            (indicator for _, indicators in self._pattern_indicators for indicator in indicators),
+            normalize=False
+        )
     
     def canonicalize(self, text: str, metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
@@ -30,14 +97,17 @@ class Canonicalizer:
         Returns:
             Canonical representation as a dictionary
         """
-        normalized = normalize_text(text)
+        # Lowercase once; the normalized view (same as normalize_text) is
+        # derived from it without a second lower()
+        lowered = text.lower()
+        normalized = collapse_whitespace(lowered)
         
         return {
             "type": self._detect_type(text, metadata),
             "roles": self._extract_roles(normalized),
             "constraints": self._extract_constraints(normalized),
             "goal": self._extract_goal(normalized),
-            "interaction_pattern": self._detect_interaction_pattern(text),
+            "interaction_pattern": self._detect_interaction_pattern(lowered),
             "metadata": self._extract_metadata(text, metadata)
         }
     
@@ -54,67 +124,46 @@ class Canonicalizer:
     
     def _extract_roles(self, text: str) -> List[str]:
         """Extract roles/personas from the text."""
-        roles = []
-        
-        # Look for role indicators
-        role_patterns = [
-            r"act as (?:a |an )?(\w+)",
-            r"you are (?:a |an )?(\w+)",
-            r"pretend to be (?:a |an )?(\w+)",
-            r"role(?:play)? (?:as )?(?:a |an )?(\w+)",
-            r"persona:\s*(\w+)",
-        ]
+        roles = set()
         
-        for pattern in role_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            roles.extend(matches)
+        # Look for role indicators (deduplicated and normalized as found)
+        for pattern in _ROLE_PATTERNS:
+            roles.update(r.lower() for r in pattern.findall(text))
         
-        # Deduplicate and normalize
-        return list(set([r.lower() for r in roles]))
+        return list(roles)
     
     def _extract_constraints(self, text: str) -> List[str]:
-        """Extract constraints/rules from the text."""
-        constraints = []
-        
-        # Look for constraint indicators
-        constraint_keywords = [
-            "always", "never", "must", "should", "cannot", "should not",
-            "only", "strict", "required", "forbidden"
-        ]
-        
-        # Find sentences containing constraint keywords
-        sentences = re.split(r'[.!?]', text)
-        for sentence in sentences:
-            for keyword in constraint_keywords:
-                if keyword in sentence.lower():
-                    # Extract the constraint type
-                    if "always" in sentence.lower():
-                        constraints.append("strict_behavior")
-                    elif "never" in sentence.lower() or "cannot" in sentence.lower():
-                        constraints.append("prohibition")
-                    elif "must" in sentence.lower() or "required" in sentence.lower():
-                        constraints.append("requirement")
-                    break
+        """Extract constraints/rules from the text (already lowercased)."""
+        constraints = set()
+        
+        # Scan once for constraint keywords and sentence ends, keeping the
+        # highest-precedence constraint class of each sentence
+        best = None
+        for match in _CONSTRAINT_SCAN.finditer(text):
+            found = _CONSTRAINT_CLASSES.get(match.group())
+            if found is None:
+                if best is not None:
+                    constraints.add(best[1])
+                    best = None
+            elif best is None or found[0] < best[0]:
+                best = found
+        
+        if best is not None:
+            constraints.add(best[1])
         
         # Look for specific patterns
-        if re.search(r"catchphrase|signature phrase", text, re.IGNORECASE):
-            constraints.append("catchphrase_required")
+        if _CATCHPHRASE.search(text):
+            constraints.add("catchphrase_required")
         
-        return list(set(constraints))
+        return list(constraints)
     
     def _extract_goal(self, text: str) -> str:
         """Extract the primary goal/objective."""
         # Check for explicit goal statements
-        goal_patterns = [
-            r"goal:\s*(\w+)",
-            r"objective:\s*(\w+)",
-            r"purpose:\s*(\w+)",
-        ]
-        
-        for pattern in goal_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in _GOAL_PATTERNS:
+            match = pattern.search(text)
             if match:
-                return match.group(1).lower()
+                return sys.intern(match.group(1).lower())
         
         # Infer goal from content
         if any(kw in text for kw in ["roleplay", "act as", "pretend"]):
@@ -128,11 +177,13 @@ class Canonicalizer:
         
         return "general"
     
-    def _detect_interaction_pattern(self, text: str) -> str:
-        """Detect the interaction pattern."""
-        for pattern_name, pattern_data in self.patterns.items():
-            indicators = pattern_data.get("indicators", [])
-            if any(indicator in text.lower() for indicator in indicators):
+    def _detect_interaction_pattern(self, lowered: str) -> str:
+        """Detect the interaction pattern from the lowercased text."""
+        found = self._indicator_matcher.find(lowered)
+        
+        # The first pattern in vocabulary order with any indicator present wins
+        for pattern_name, indicators in self._pattern_indicators:
+            if any(indicator in found for indicator in indicators):
                 return pattern_name
         
         return "unstructured"
@@ -143,24 +194,14 @@ class Canonicalizer:
         
         # Calculate length category
         word_count = len(text.split())
-        if word_count < 50:
-            metadata["length"] = "short"
-        elif word_count < 200:
-            metadata["length"] = "medium"
-        else:
-            metadata["length"] = "long"
+        metadata["length"] = _LENGTH_LABELS[bisect_right(_LENGTH_BOUNDS, word_count)]
         
         # Estimate complexity based on structure
         complexity_score = 0
-        complexity_score += len(re.findall(r'[.!?]', text)) * 0.5  # Sentence count
-        complexity_score += len(re.findall(r'\n', text)) * 0.3  # Line breaks
-        complexity_score += len(re.findall(r'[:\-\*]', text)) * 0.2  # Structural markers
-        
-        if complexity_score < 5:
-            metadata["complexity"] = "simple"
-        elif complexity_score < 15:
-            metadata["complexity"] = "moderate"
-        else:
-            metadata["complexity"] = "complex"
+        complexity_score += len(_COMPLEXITY_SENT.findall(text)) * 0.5  # Sentence count
+        complexity_score += len(_COMPLEXITY_LF.findall(text)) * 0.3  # Line breaks
+        complexity_score += len(_COMPLEXITY_STRUCT.findall(text)) * 0.2  # Structural markers
+        
+        metadata["complexity"] = _COMPLEXITY_LABELS[bisect_right(_COMPLEXITY_BOUNDS, complexity_score)]
         
         return metadata
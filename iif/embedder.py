@@ -4,32 +4,151 @@ Layer 5: Optional Embedding Filter
 Lightweight semantic filter for edge cases (optional dependency).
 """
 
-from typing import List, Optional
+from abc import ABC, abstractmethod
+from array import array
+from collections import OrderedDict
+from typing import Any, List, Optional
+import hashlib
+import importlib.util
+import inspect
+import sqlite3
 import warnings
 
 
+def _module_available(name: str) -> bool:
+    """Check whether a module can be imported, without importing it."""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+class CacheStrategy(ABC):
+    """
+    Storage for computed embeddings, keyed by a hash of model and text.
+    """
+    
+    @abstractmethod
+    def get(self, key: str) -> Optional[List[float]]:
+        """Return the cached vector for a key, or None if missing."""
+    
+    @abstractmethod
+    def set(self, key: str, vector: List[float]):
+        """Store the vector for a key."""
+
+
+class MemoryCache(CacheStrategy):
+    """
+    In-memory LRU embedding cache.
+    
+    Vectors are copied in and out, so callers may modify what they get.
+    """
+    
+    def __init__(self, maxsize: int = 10000):
+        """
+        Args:
+            maxsize: Maximum number of vectors kept
+        """
+        self.maxsize = maxsize
+        self._vectors: "OrderedDict[str, List[float]]" = OrderedDict()
+    
+    def get(self, key: str) -> Optional[List[float]]:
+        vector = self._vectors.get(key)
+        if vector is None:
+            return None
+        self._vectors.move_to_end(key)
+        return list(vector)
+    
+    def set(self, key: str, vector: List[float]):
+        self._vectors[key] = list(vector)
+        self._vectors.move_to_end(key)
+        if len(self._vectors) > self.maxsize:
+            self._vectors.popitem(last=False)
+
+
+class SQLiteCache(CacheStrategy):
+    """
+    Persistent embedding cache in a SQLite file, shared across runs.
+    """
+    
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Database file (created if missing)
+        """
+        self.path = path
+        self._connection = sqlite3.connect(path)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB)"
+        )
+    
+    def get(self, key: str) -> Optional[List[float]]:
+        row = self._connection.execute(
+            "SELECT vector FROM embeddings WHERE key = ?", (key,)
+        ).fetchone()
+        return array("d", row[0]).tolist() if row else None
+    
+    def set(self, key: str, vector: List[float]):
+        with self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                (key, array("d", vector).tobytes())
+            )
+
+
 class Embedder:
     """
     Optional semantic similarity using lightweight embeddings.
     Only used when rule-based methods are inconclusive.
     """
     
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
+    PRECISIONS = ("fp32", "fp16", "bf16")
+    BACKENDS = ("torch", "onnx", "openvino")
+    
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2",
+                 precision: str = "fp32", device: Optional[str] = None,
+                 cache: Optional[CacheStrategy] = None,
+                 backend: str = "torch", model_file: Optional[str] = None):
         """
         Initialize the embedder with a lightweight model.
         
         Args:
             model_name: Name of the sentence-transformers model
+            precision: Inference precision: "fp32", "fp16" or "bf16"
+            device: Device to run on (e.g. "cpu", "cuda"); auto-detected if None
+            cache: Optional cache so repeated texts are only encoded once
+            backend: Inference backend: "torch", "onnx" or "openvino"
+            model_file: Exported model file for the onnx/openvino backends,
+                e.g. "onnx/model_O4.onnx" or the int8-quantized
+                "onnx/model_qint8_avx512_vnni.onnx"
         """
+        if precision not in self.PRECISIONS:
+            raise ValueError(
+                f"Unknown precision '{precision}', expected one of {self.PRECISIONS}"
+            )
+        if backend not in self.BACKENDS:
+            raise ValueError(
+                f"Unknown backend '{backend}', expected one of {self.BACKENDS}"
+            )
+        if backend != "torch" and precision != "fp32":
+            raise ValueError(
+                "precision only applies to the torch backend; "
+                "choose a quantized model_file for onnx/openvino instead"
+            )
+        
         self.model = None
         self.model_name = model_name
+        self.precision = precision
+        self.device = device
+        self.cache = cache
+        self.backend = backend
+        self.model_file = model_file
         self._initialize_model()
     
     def _initialize_model(self):
         """Lazy initialization of the embedding model."""
         try:
             from sentence_transformers import SentenceTransformer
-            self.model = SentenceTransformer(self.model_name)
         except ImportError:
             warnings.warn(
                 "sentence-transformers not installed. "
@@ -37,6 +156,45 @@ class Embedder:
                 "Install with: pip install sentence-transformers"
             )
             self.model = None
+            return
+        
+        if self.backend != "torch":
+            extra = "onnxruntime" if self.backend == "onnx" else "openvino"
+            
+            # sentence-transformers < 3.2 rejects backend= with a TypeError and
+            # newer versions raise a bare Exception without optimum, so both
+            # are checked before constructing the model
+            if "backend" not in inspect.signature(SentenceTransformer.__init__).parameters:
+                warnings.warn(
+                    f"{self.backend} backend requires sentence-transformers>=3.2. "
+                    "Falling back to the torch backend. "
+                    "Install with: pip install -U sentence-transformers"
+                )
+                self.backend = "torch"
+            elif not all(_module_available(name) for name in ("optimum", extra)):
+                warnings.warn(
+                    f"{self.backend} backend requires optimum. "
+                    "Falling back to the torch backend. "
+                    f"Install with: pip install optimum[{extra}]"
+                )
+                self.backend = "torch"
+            else:
+                model_kwargs = {"file_name": self.model_file} if self.model_file else None
+                self.model = SentenceTransformer(
+                    self.model_name, device=self.device,
+                    backend=self.backend, model_kwargs=model_kwargs
+                )
+                return
+        
+        self.model = SentenceTransformer(self.model_name, device=self.device)
+        
+        # Half precision halves weight/activation memory; the embedder is
+        # only a tiebreaker, so the small cosine drift is acceptable
+        if self.precision == "fp16":
+            self.model.half()
+        elif self.precision == "bf16":
+            import torch
+            self.model.to(dtype=torch.bfloat16)
     
     def is_available(self) -> bool:
         """Check if embedding functionality is available."""
@@ -55,7 +213,100 @@ class Embedder:
         if not self.is_available():
             return None
         
-        return self.model.encode(text).tolist()
+        if self.cache is None:
+            return self.model.encode(text).tolist()
+        
+        key = self._cache_key(text, normalized=False)
+        vector = self.cache.get(key)
+        if vector is None:
+            vector = self.model.encode(text).tolist()
+            self.cache.set(key, vector)
+        
+        return vector
+    
+    def embed_many(self, texts: List[str], batch_size: int = 64,
+                   normalize_embeddings: bool = True) -> Optional[Any]:
+        """
+        Generate embeddings for many texts in batched forward passes.
+        
+        SentenceTransformer.encode already orders texts by length before
+        batching (and restores the input order), so each batch pads to
+        similar lengths without sorting here.
+        
+        Args:
+            texts: Input texts
+            batch_size: Number of texts encoded per forward pass
+            normalize_embeddings: L2-normalize rows so dot products are cosines
+            
+        Returns:
+            numpy array of shape (len(texts), dim) or None if unavailable
+        """
+        if not self.is_available():
+            return None
+        
+        import numpy as np
+        
+        if not texts:
+            # Keep the row width so an empty batch still multiplies as a matrix
+            return np.empty((0, self.model.get_sentence_embedding_dimension()), dtype=np.float32)
+        
+        if self.cache is None:
+            return self._encode(texts, batch_size, normalize_embeddings)
+        
+        # Encode only texts missing from the cache, in one batch
+        keys = [self._cache_key(text, normalize_embeddings) for text in texts]
+        vectors = [self.cache.get(key) for key in keys]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        
+        if missing:
+            encoded = self._encode([texts[i] for i in missing], batch_size, normalize_embeddings)
+            for i, vector in zip(missing, encoded.tolist()):
+                vectors[i] = vector
+                self.cache.set(keys[i], vector)
+        
+        return np.asarray(vectors, dtype=np.float32)
+    
+    def _encode(self, texts: List[str], batch_size: int, normalize_embeddings: bool) -> Any:
+        """Encode texts with the model into a numpy array."""
+        return self.model.encode(
+            texts,
+            batch_size=batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=normalize_embeddings,
+            show_progress_bar=False
+        )
+    
+    def _cache_key(self, text: str, normalized: bool) -> str:
+        """Cache key for a text under this model configuration."""
+        prefix = (f"{self.model_name}\x00{self.backend}\x00{self.model_file}\x00"
+                  f"{self.precision}\x00{int(normalized)}\x00")
+        return hashlib.blake2b((prefix + text).encode("utf-8"), digest_size=16).hexdigest()
+    
+    def similarity_matrix(self, texts_a: List[str], texts_b: List[str],
+                          batch_size: int = 64) -> Optional[Any]:
+        """
+        Calculate semantic similarity between every pair of texts from two lists.
+        
+        Each list is encoded once and all pairs are scored with one matrix
+        product.
+        
+        Args:
+            texts_a: First list of texts
+            texts_b: Second list of texts
+            batch_size: Number of texts encoded per forward pass
+            
+        Returns:
+            numpy array of shape (len(texts_a), len(texts_b)) with scores
+            (0.0 to 1.0), or None if unavailable
+        """
+        if not self.is_available():
+            return None
+        
+        emb_a = self.embed_many(texts_a, batch_size=batch_size)
+        emb_b = self.embed_many(texts_b, batch_size=batch_size)
+        
+        # Normalize to 0-1 range (cosine similarity is -1 to 1)
+        return (emb_a @ emb_b.T + 1) / 2
     
     def similarity(self, text1: str, text2: str) -> Optional[float]:
         """
@@ -71,12 +322,11 @@ class Embedder:
         if not self.is_available():
             return None
         
-        from sentence_transformers import util
-        
-        emb1 = self.model.encode(text1)
-        emb2 = self.model.encode(text2)
+        # Encode both texts in a single forward pass; normalized embeddings
+        # make the dot product their cosine similarity
+        emb1, emb2 = self.embed_many([text1, text2], batch_size=2)
         
-        similarity = util.cos_sim(emb1, emb2).item()
+        similarity = float(emb1 @ emb2)
         
         # Normalize to 0-1 range (cosine similarity is -1 to 1)
         return (similarity + 1) / 2
@@ -4,10 +4,23 @@ Layer 2: Structural Fingerprinting
 Extracts shape-based features independent of content.
 """
 
-from typing import Dict, List, Any
+from typing import Dict, List, Any, NamedTuple
 import math
 
 
+class FingerprintVector(NamedTuple):
+    """Fingerprint fields in a fixed order, as compared by `compare_vectors`."""
+    interaction_pattern: Any
+    goal_type: Any
+    length_category: Any
+    role_count: int
+    constraint_count: int
+    constraint_density: float
+    complexity_score: float
+    has_roles: Any
+    has_constraints: Any
+
+
 class Fingerprinter:
     """
     Generates structural fingerprints for canonical representations.
@@ -90,6 +103,31 @@ class Fingerprinter:
         # Normalize to 0-10 scale
         return min(score, 10.0)
     
+    def to_vector(self, fp: Dict[str, Any]) -> FingerprintVector:
+        """
+        Flatten a fingerprint into the fixed-order tuple used by `compare_vectors`.
+        
+        Computing this once per document avoids repeating the dict lookups
+        for every pair it is compared in.
+        
+        Args:
+            fp: Fingerprint from `fingerprint`
+            
+        Returns:
+            FingerprintVector (missing fields default to None or 0)
+        """
+        return FingerprintVector(
+            fp.get("interaction_pattern"),
+            fp.get("goal_type"),
+            fp.get("length_category"),
+            fp.get("role_count", 0),
+            fp.get("constraint_count", 0),
+            fp.get("constraint_density", 0),
+            fp.get("complexity_score", 0),
+            fp.get("has_roles"),
+            fp.get("has_constraints"),
+        )
+    
     def compare_fingerprints(self, fp1: Dict[str, Any], fp2: Dict[str, Any]) -> float:
         """
         Compare two fingerprints and return similarity score.
@@ -101,61 +139,49 @@ class Fingerprinter:
         Returns:
             Similarity score (0.0 to 1.0)
         """
-        similarities = []
-        
-        # Exact matches
-        if fp1.get("interaction_pattern") == fp2.get("interaction_pattern"):
-            similarities.append(1.0)
-        else:
-            similarities.append(0.0)
+        return self.compare_vectors(self.to_vector(fp1), self.to_vector(fp2))
+    
+    @staticmethod
+    def compare_vectors(v1: FingerprintVector, v2: FingerprintVector) -> float:
+        """
+        Compare two fingerprint vectors (see `to_vector`).
         
-        if fp1.get("goal_type") == fp2.get("goal_type"):
-            similarities.append(1.0)
-        else:
-            similarities.append(0.5)  # Partial credit for different goals
+        Args:
+            v1: First fingerprint vector
+            v2: Second fingerprint vector
+            
+        Returns:
+            Similarity score (0.0 to 1.0)
+        """
+        pattern1, goal1, length1, role1, constraint1, density1, complexity1, has_roles1, has_constraints1 = v1
+        pattern2, goal2, length2, role2, constraint2, density2, complexity2, has_roles2, has_constraints2 = v2
         
-        if fp1.get("length_category") == fp2.get("length_category"):
-            similarities.append(1.0)
-        else:
-            similarities.append(0.7)  # Partial credit for different lengths
+        # Exact matches (partial credit for different goals and lengths)
+        total = 1.0 if pattern1 == pattern2 else 0.0
+        total += 1.0 if goal1 == goal2 else 0.5
+        total += 1.0 if length1 == length2 else 0.7
         
-        # Numeric similarities
-        role1 = fp1.get("role_count", 0)
-        role2 = fp2.get("role_count", 0)
+        # Numeric similarities: both zero is a perfect match, one zero none
         if role1 == 0 and role2 == 0:
-            role_sim = 1.0  # Both have no roles, perfect match
+            total += 1.0
         elif role1 == 0 or role2 == 0:
-            role_sim = 0.0  # One has roles, one doesn't
+            total += 0.0
         else:
-            role_sim = 1.0 - abs(role1 - role2) / max(role1, role2)
-        similarities.append(role_sim)
+            total += 1.0 - abs(role1 - role2) / max(role1, role2)
         
-        constraint1 = fp1.get("constraint_count", 0)
-        constraint2 = fp2.get("constraint_count", 0)
         if constraint1 == 0 and constraint2 == 0:
-            constraint_sim = 1.0  # Both have no constraints, perfect match
+            total += 1.0
         elif constraint1 == 0 or constraint2 == 0:
-            constraint_sim = 0.0  # One has constraints, one doesn't
+            total += 0.0
         else:
-            constraint_sim = 1.0 - abs(constraint1 - constraint2) / max(constraint1, constraint2)
-        similarities.append(constraint_sim)
-        
-        density_sim = 1.0 - abs(fp1.get("constraint_density", 0) - fp2.get("constraint_density", 0))
-        similarities.append(density_sim)
+            total += 1.0 - abs(constraint1 - constraint2) / max(constraint1, constraint2)
         
-        complexity_sim = 1.0 - abs(fp1.get("complexity_score", 0) - fp2.get("complexity_score", 0)) / 10.0
-        similarities.append(complexity_sim)
+        total += 1.0 - abs(density1 - density2)
+        total += 1.0 - abs(complexity1 - complexity2) / 10.0
         
         # Boolean similarities
-        if fp1.get("has_roles") == fp2.get("has_roles"):
-            similarities.append(1.0)
-        else:
-            similarities.append(0.0)
-        
-        if fp1.get("has_constraints") == fp2.get("has_constraints"):
-            similarities.append(1.0)
-        else:
-            similarities.append(0.0)
+        total += 1.0 if has_roles1 == has_roles2 else 0.0
+        total += 1.0 if has_constraints1 == has_constraints2 else 0.0
         
-        # Return weighted average
-        return sum(similarities) / len(similarities)
+        # Average of the nine feature similarities
+        return total / 9
@@ -0,0 +1,200 @@
+"""
+Candidate Generation: MinHash-LSH
+
+Finds pairs of documents that are likely to be similar without comparing
+every pair, so that only those candidates go through full scoring.
+"""
+
+import hashlib
+import random
+from functools import lru_cache
+from typing import Dict, Hashable, Iterable, List, Set, Tuple
+
+from .utils import normalize_text
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def shingle(text: str, size: int = 5) -> Set[str]:
+    """
+    Split text into a set of word shingles.
+    
+    Args:
+        text: Input text
+        size: Number of consecutive words per shingle
+    
+    Returns:
+        Set of shingles (texts shorter than `size` words form a single shingle)
+    """
+    words = normalize_text(text).split()
+    
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+class MinHash:
+    """
+    Computes MinHash signatures that estimate Jaccard similarity of shingle sets.
+    """
+    
+    def __init__(self, num_perm: int = 128, seed: int = 1):
+        """
+        Initialize the hash permutations.
+        
+        Args:
+            num_perm: Number of permutations (signature length)
+            seed: Seed for the permutation parameters
+        """
+        self.num_perm = num_perm
+        rng = random.Random(seed)
+        self._permutations = [
+            (rng.randint(1, _MERSENNE_PRIME - 1), rng.randint(0, _MERSENNE_PRIME - 1))
+            for _ in range(num_perm)
+        ]
+    
+    def signature(self, shingles: Iterable[str]) -> Tuple[int, ...]:
+        """
+        Compute the MinHash signature of a set of shingles.
+        
+        Args:
+            shingles: Shingles of one document
+        
+        Returns:
+            Tuple of `num_perm` minimum hash values
+        """
+        hashes = [
+            int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little")
+            for s in set(shingles)
+        ]
+        
+        if not hashes:
+            return (_MAX_HASH,) * self.num_perm
+        
+        return tuple(
+            min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+            for a, b in self._permutations
+        )
+
+
+@lru_cache(maxsize=None)
+def _optimal_bands(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """
+    Choose (bands, rows) minimizing false positives plus false negatives
+    around the Jaccard threshold.
+    """
+    def collision_area(b: int, r: int, lo: float, hi: float) -> float:
+        steps = 100
+        width = (hi - lo) / steps
+        area = 0.0
+        for k in range(steps):
+            s = lo + (k + 0.5) * width
+            area += 1.0 - (1.0 - s ** r) ** b
+        return area * width
+    
+    best, best_error = (1, num_perm), float("inf")
+    for b in range(1, num_perm + 1):
+        for r in range(1, num_perm // b + 1):
+            false_positive = collision_area(b, r, 0.0, threshold)
+            false_negative = (1.0 - threshold) - collision_area(b, r, threshold, 1.0)
+            error = 0.5 * false_positive + 0.5 * false_negative
+            if error < best_error:
+                best, best_error = (b, r), error
+    
+    return best
+
+
+class MinHashLSH:
+    """
+    Locality-sensitive hash index over MinHash signatures.
+    
+    Signatures are split into bands; two documents become candidates when
+    they agree on every row of at least one band.
+    """
+    
+    def __init__(self, threshold: float = 0.6, num_perm: int = 128):
+        """
+        Initialize an empty index.
+        
+        Args:
+            threshold: Approximate Jaccard similarity at which pairs collide
+            num_perm: Signature length of the MinHashes that will be inserted
+        """
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands, self.rows = _optimal_bands(threshold, num_perm)
+        self._buckets: List[Dict[Tuple[int, ...], List[Hashable]]] = [
+            {} for _ in range(self.bands)
+        ]
+    
+    def _band_keys(self, signature: Tuple[int, ...]) -> List[Tuple[int, ...]]:
+        """Split a signature into its band keys."""
+        if len(signature) != self.num_perm:
+            raise ValueError(
+                f"Signature length {len(signature)} does not match num_perm {self.num_perm}"
+            )
+        
+        return [
+            signature[band * self.rows:(band + 1) * self.rows]
+            for band in range(self.bands)
+        ]
+    
+    def insert(self, key: Hashable, signature: Tuple[int, ...]):
+        """
+        Add a document signature to the index.
+        
+        Args:
+            key: Identifier returned by `query`
+            signature: MinHash signature of the document
+        """
+        for bucket, band_key in zip(self._buckets, self._band_keys(signature)):
+            bucket.setdefault(band_key, []).append(key)
+    
+    def query(self, signature: Tuple[int, ...]) -> Set[Hashable]:
+        """
+        Find keys that collide with a signature in at least one band.
+        
+        Args:
+            signature: MinHash signature to look up
+        
+        Returns:
+            Set of candidate keys (deduplicated across bands)
+        """
+        candidates = set()
+        
+        for bucket, band_key in zip(self._buckets, self._band_keys(signature)):
+            candidates.update(bucket.get(band_key, ()))
+        
+        return candidates
+
+
+def candidate_pairs(texts: List[str], threshold: float = 0.6,
+                    num_perm: int = 128, shingle_size: int = 5) -> List[Tuple[int, int]]:
+    """
+    Find index pairs (i, j), i < j, of texts that are likely near-duplicates.
+    
+    Args:
+        texts: Documents to index
+        threshold: Approximate shingle Jaccard similarity for a collision
+        num_perm: MinHash signature length
+        shingle_size: Words per shingle
+    
+    Returns:
+        Sorted list of candidate pairs
+    """
+    minhash = MinHash(num_perm=num_perm)
+    lsh = MinHashLSH(threshold=threshold, num_perm=num_perm)
+    
+    signatures = [minhash.signature(shingle(text, shingle_size)) for text in texts]
+    for i, signature in enumerate(signatures):
+        lsh.insert(i, signature)
+    
+    pairs = set()
+    for i, signature in enumerate(signatures):
+        for j in lsh.query(signature):
+            if j > i:
+                pairs.add((i, j))
+    
+    return sorted(pairs)
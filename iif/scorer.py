@@ -4,61 +4,359 @@ Layer 4: Similarity Scoring
 Computes deterministic similarity scores with explanations.
 """
 
-from typing import Dict, List, Any, Tuple
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from copy import deepcopy
+from itertools import combinations
+from typing import Callable, Dict, Iterable, List, Any, Literal, NamedTuple, Optional, Tuple
 from .canonicalizer import Canonicalizer
-from .fingerprinter import Fingerprinter
+from .fingerprinter import Fingerprinter, FingerprintVector
 from .tagger import IntentTagger
 
 
+# Similarity of distinct interaction patterns, keyed by (pattern1, pattern2).
+# Not symmetric: example_based -> instructional has no partial credit.
+_PATTERN_SIMILARITY = {
+    ("conversational", "instructional"): 0.6,
+    ("instructional", "conversational"): 0.6,
+    ("instructional", "example_based"): 0.6,
+    ("template", "list"): 0.6,
+    ("list", "template"): 0.6,
+}
+
+
+# Report detail levels accepted by compare/compare_features/batch_compare
+DetailLevel = Literal["full", "summary", "score"]
+
+
+class DocFeatures(NamedTuple):
+    """Per-document outputs of layers 1-3, computed once and reused across pairs."""
+    canonical: Dict[str, Any]
+    fingerprint: Dict[str, Any]
+    fingerprint_vector: FingerprintVector
+    tags: Dict[str, Any]
+    tag_masks: Tuple[int, int]
+
+
+# Per-process state for parallel find_similar workers, set once by the pool
+# initializer so features are not re-sent with every chunk of pairs
+_worker_state: Dict[str, Any] = {}
+
+
+def _init_worker(scorer: "SimilarityScorer", features: List[DocFeatures],
+                 structure_ids: List[int], threshold: float, scores_only: bool):
+    """Store the scorer and features in a worker process."""
+    _worker_state["scorer"] = scorer
+    _worker_state["features"] = features
+    _worker_state["structure_ids"] = structure_ids
+    _worker_state["structure_memo"] = {}
+    _worker_state["threshold"] = threshold
+    _worker_state["scores_only"] = scores_only
+
+
+def _init_preprocess_worker(scorer: "SimilarityScorer"):
+    """Store the scorer in a preprocessing or batch_compare worker process."""
+    _worker_state["scorer"] = scorer
+
+
+def _preprocess_chunk(texts: List[str]) -> List[DocFeatures]:
+    """Preprocess one chunk of texts in a worker process."""
+    preprocess = _worker_state["scorer"]._preprocess
+    return [preprocess(text) for text in texts]
+
+
+def _compare_chunk(task: Tuple[int, List[Tuple[str, str]], float, str]) -> List[Dict[str, Any]]:
+    """Compare one chunk of batch_compare pairs in a worker process."""
+    start, prompts, threshold, detail_level = task
+    return _worker_state["scorer"]._compare_prompt_pairs(prompts, threshold, detail_level, start)
+
+
+def _score_chunk(chunk: List[Tuple[int, int]]) -> List[Any]:
+    """Score one chunk of pairs in a worker process."""
+    return _worker_state["scorer"]._score_pairs(
+        _worker_state["features"], chunk,
+        _worker_state["threshold"], _worker_state["scores_only"],
+        _worker_state["structure_ids"], _worker_state["structure_memo"]
+    )
+
+
 class SimilarityScorer:
     """
     Computes similarity between prompts with detailed explanations.
     """
     
+    # Component weights of the overall similarity score
+    STRUCTURAL_WEIGHT = 0.3
+    TAG_WEIGHT = 0.5
+    PATTERN_WEIGHT = 0.2
+    
+    # Number of preprocessed prompts kept for reuse across comparisons
+    PREPROCESS_CACHE_SIZE = 4096
+    
+    # Number of (structure, structure) similarities remembered per find_similar run
+    STRUCTURE_MEMO_SIZE = 65536
+    
     def __init__(self):
         """Initialize the scorer with all required components."""
         self.canonicalizer = Canonicalizer()
         self.fingerprinter = Fingerprinter()
         self.tagger = IntentTagger()
+        self._preprocess_cache: "OrderedDict[Tuple[str, Any], DocFeatures]" = OrderedDict()
+        # Layers 1-2 of prompts that compare(threshold=...) has not needed to tag yet
+        self._structure_cache: "OrderedDict[Tuple[str, Any], Tuple[Dict[str, Any], Dict[str, Any], FingerprintVector]]" = OrderedDict()
     
     def compare(self, text1: str, text2: str, 
                 metadata1: Dict[str, Any] = None,
-                metadata2: Dict[str, Any] = None) -> Dict[str, Any]:
+                metadata2: Dict[str, Any] = None,
+                threshold: Optional[float] = None,
+                detail_level: DetailLevel = "full") -> Dict[str, Any]:
         """
         Compare two prompts and return detailed similarity analysis.
         
+        With a threshold, structure and patterns are compared before tagging.
+        If even a perfect tag overlap could not lift the score to the
+        threshold, tagging is skipped and the report has verdict
+        "below_threshold": its similarity_score is that upper bound (always
+        below the threshold), its breakdown has "tag_overlap_bound" (1.0)
+        in place of the unmeasured "tag_overlap", and no tags are matched.
+        
         Args:
             text1: First prompt text
             text2: Second prompt text
             metadata1: Optional metadata for first prompt
             metadata2: Optional metadata for second prompt
+            threshold: Optional minimum similarity of interest
+            detail_level: "full" (default), "summary" or "score"; see `compare_features`
             
         Returns:
             Detailed similarity report
         """
-        # Canonicalize both inputs
-        canonical1 = self.canonicalizer.canonicalize(text1, metadata1)
-        canonical2 = self.canonicalizer.canonicalize(text2, metadata2)
+        if threshold is None:
+            return self.compare_features(
+                self.preprocess(text1, metadata1),
+                self.preprocess(text2, metadata2),
+                detail_level
+            )
+        
+        key1 = self._cache_key(text1, metadata1)
+        key2 = self._cache_key(text2, metadata2)
+        features1 = self._cache_get(key1)
+        features2 = self._cache_get(key2)
+        
+        # (canonical, fingerprint, fingerprint_vector) of each prompt
+        structure1 = features1[:3] if features1 else self._cached_structure(key1, text1, metadata1)
+        structure2 = features2[:3] if features2 else self._cached_structure(key2, text2, metadata2)
+        
+        structural_sim = self.fingerprinter.compare_vectors(structure1[2], structure2[2])
+        pattern_sim = self._compare_patterns(structure1[0], structure2[0])
+        
+        # Allow for rounding of the reported score to 3 decimals
+        max_similarity = self._weighted_score(structural_sim, 1.0, pattern_sim)
+        if max_similarity < threshold - 0.0005:
+            return self._build_bound_report(structure1, structure2, structural_sim,
+                                            pattern_sim, detail_level)
+        
+        if features1 is None:
+            features1 = self._cache_put(key1, self._preprocess(text1, metadata1, structure1))
+        if features2 is None:
+            features2 = self._cache_put(key2, self._preprocess(text2, metadata2, structure2))
+        
+        return self.compare_features(features1, features2, detail_level)
+    
+    def preprocess(self, text: str, metadata: Dict[str, Any] = None) -> DocFeatures:
+        """
+        Run canonicalization, fingerprinting and tagging for one prompt.
+        
+        Results are cached by text and metadata (least recently used entries
+        are evicted), so a prompt appearing in many comparisons is processed
+        once. Cached features are shared between calls and must not be
+        modified.
+        
+        Args:
+            text: Prompt text
+            metadata: Optional metadata for the prompt
+            
+        Returns:
+            DocFeatures that can be passed to `compare_features`
+        """
+        key = self._cache_key(text, metadata)
+        features = self._cache_get(key)
+        
+        if features is None:
+            structure = self._structure_cache.pop(key, None) if key is not None else None
+            features = self._cache_put(key, self._preprocess(text, metadata, structure))
         
-        # Generate fingerprints
-        fingerprint1 = self.fingerprinter.fingerprint(canonical1)
-        fingerprint2 = self.fingerprinter.fingerprint(canonical2)
+        return features
+    
+    def preprocess_many(self, texts: List[str], n_jobs: int = 1,
+                        chunk_size: int = 50) -> List[DocFeatures]:
+        """
+        Preprocess many prompts, optionally in parallel.
         
-        # Generate tags
-        tags1 = self.tagger.tag(canonical1, text1)
-        tags2 = self.tagger.tag(canonical2, text2)
+        Each distinct text missing from the cache is processed once; with
+        n_jobs > 1 they are spread over worker processes (canonicalization
+        and tagging are CPU-bound Python, so threads would not help).
         
+        Args:
+            texts: Prompt texts
+            n_jobs: Number of worker processes (-1 for all CPUs, 1 to run serially)
+            chunk_size: Number of texts preprocessed per worker task
+            
+        Returns:
+            DocFeatures for each text, in order
+        """
+        if n_jobs < 0:
+            n_jobs = os.cpu_count() or 1
+        
+        # Results are collected here rather than read back from the cache,
+        # which may already have evicted them when texts outnumber its size
+        found: Dict[str, DocFeatures] = {}
+        missing = []
+        for text in dict.fromkeys(texts):
+            features = self._cache_get(self._cache_key(text, None))
+            if features is None:
+                missing.append(text)
+            else:
+                found[text] = features
+        
+        chunks = [missing[k:k + chunk_size] for k in range(0, len(missing), chunk_size)]
+        
+        if n_jobs > 1 and len(chunks) > 1:
+            with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_preprocess_worker,
+                                     initargs=(self,)) as executor:
+                for chunk, chunk_features in zip(chunks, executor.map(_preprocess_chunk, chunks)):
+                    for text, features in zip(chunk, chunk_features):
+                        found[text] = self._cache_put(self._cache_key(text, None), features)
+        else:
+            for text in missing:
+                found[text] = self.preprocess(text)
+        
+        return [found[text] for text in texts]
+    
+    def clear_cache(self):
+        """Drop all cached preprocessing results."""
+        self._preprocess_cache.clear()
+        self._structure_cache.clear()
+    
+    def _cache_key(self, text: str, metadata: Optional[Dict[str, Any]]) -> Optional[Tuple[str, Any]]:
+        """Preprocess cache key, or None if the metadata cannot be part of one."""
+        try:
+            key = (text, tuple(sorted(metadata.items())) if metadata else None)
+            hash(key)
+        except TypeError:
+            # Unhashable or unorderable metadata values: skip the cache
+            return None
+        
+        return key
+    
+    def _cache_get(self, key: Optional[Tuple[str, Any]]) -> Optional[DocFeatures]:
+        """Look up cached features, marking them as recently used."""
+        if key is None:
+            return None
+        
+        features = self._preprocess_cache.get(key)
+        if features is not None:
+            self._preprocess_cache.move_to_end(key)
+        
+        return features
+    
+    def _cache_put(self, key: Optional[Tuple[str, Any]], features: DocFeatures) -> DocFeatures:
+        """Store features in the cache, evicting the least recently used entry."""
+        if key is not None:
+            self._preprocess_cache[key] = features
+            if len(self._preprocess_cache) > self.PREPROCESS_CACHE_SIZE:
+                self._preprocess_cache.popitem(last=False)
+        
+        return features
+    
+    def _structure(self, text: str, metadata: Dict[str, Any] = None) -> Tuple[Dict[str, Any], Dict[str, Any], FingerprintVector]:
+        """Run layers 1-2 for one prompt: (canonical, fingerprint, fingerprint_vector)."""
+        canonical = self.canonicalizer.canonicalize(text, metadata)
+        fingerprint = self.fingerprinter.fingerprint(canonical)
+        
+        return canonical, fingerprint, self.fingerprinter.to_vector(fingerprint)
+    
+    def _cached_structure(self, key: Optional[Tuple[str, Any]], text: str,
+                          metadata: Dict[str, Any] = None) -> Tuple[Dict[str, Any], Dict[str, Any], FingerprintVector]:
+        """`_structure` with an LRU cache under the preprocess cache key."""
+        if key is None:
+            return self._structure(text, metadata)
+        
+        structure = self._structure_cache.get(key)
+        if structure is not None:
+            self._structure_cache.move_to_end(key)
+            return structure
+        
+        structure = self._structure_cache[key] = self._structure(text, metadata)
+        if len(self._structure_cache) > self.PREPROCESS_CACHE_SIZE:
+            self._structure_cache.popitem(last=False)
+        
+        return structure
+    
+    def _preprocess(self, text: str, metadata: Dict[str, Any] = None,
+                    structure: Optional[Tuple[Dict[str, Any], Dict[str, Any], FingerprintVector]] = None) -> DocFeatures:
+        """Run layers 1-3 for one prompt without caching, reusing `structure` if given."""
+        canonical, fingerprint, fingerprint_vector = structure or self._structure(text, metadata)
+        tags = self.tagger.tag(canonical, text)
+        
+        return DocFeatures(
+            canonical=canonical,
+            fingerprint=fingerprint,
+            fingerprint_vector=fingerprint_vector,
+            tags=tags,
+            tag_masks=self.tagger.tag_masks(tags)
+        )
+    
+    def compare_features(self, features1: DocFeatures, features2: DocFeatures,
+                         detail_level: DetailLevel = "full") -> Dict[str, Any]:
+        """
+        Compare two preprocessed prompts and return detailed similarity analysis.
+        
+        Args:
+            features1: Features of the first prompt (from `preprocess`)
+            features2: Features of the second prompt (from `preprocess`)
+            detail_level: How much of the report to build: "full" (everything),
+                "summary" (no `details` with the raw canonical forms,
+                fingerprints and tags) or "score" (only `similarity_score`,
+                `breakdown` and `verdict`)
+            
+        Returns:
+            Detailed similarity report
+        """
         # Calculate component similarities
-        structural_sim = self.fingerprinter.compare_fingerprints(fingerprint1, fingerprint2)
-        tag_sim, matched_tags = self.tagger.compare_tags(tags1, tags2)
-        pattern_sim = self._compare_patterns(canonical1, canonical2)
+        structural_sim = self.fingerprinter.compare_vectors(
+            features1.fingerprint_vector, features2.fingerprint_vector
+        )
+        tag_sim, matched_mask = self.tagger.compare_tag_masks(features1.tag_masks, features2.tag_masks)
+        matched_tags = self.tagger.mask_tags(matched_mask)
+        pattern_sim = self._compare_patterns(features1.canonical, features2.canonical)
+        
+        return self._build_report(features1, features2,
+                                  structural_sim, tag_sim, pattern_sim, matched_tags, detail_level)
+    
+    def _build_report(self, features1: DocFeatures, features2: DocFeatures,
+                      structural_sim: float, tag_sim: float, pattern_sim: float,
+                      matched_tags: List[str], detail_level: DetailLevel = "full") -> Dict[str, Any]:
+        """Combine component similarities into a similarity report of the given detail level."""
+        canonical1, fingerprint1, tags1 = features1.canonical, features1.fingerprint, features1.tags
+        canonical2, fingerprint2, tags2 = features2.canonical, features2.fingerprint, features2.tags
         
         # Calculate overall similarity (weighted combination)
-        overall_similarity = (
-            structural_sim * 0.3 +
-            tag_sim * 0.5 +
-            pattern_sim * 0.2
-        )
+        overall_similarity = self._weighted_score(structural_sim, tag_sim, pattern_sim)
+        
+        breakdown = {
+            "structural": round(structural_sim, 3),
+            "tag_overlap": round(tag_sim, 3),
+            "pattern_match": round(pattern_sim, 3)
+        }
+        
+        if detail_level == "score":
+            return {
+                "similarity_score": round(overall_similarity, 3),
+                "breakdown": breakdown,
+                "verdict": self._determine_verdict(overall_similarity)
+            }
         
         # Generate explanation
         explanation = self._generate_explanation(
@@ -71,24 +369,70 @@ class SimilarityScorer:
         # Determine verdict
         verdict = self._determine_verdict(overall_similarity)
         
-        return {
+        report = {
             "similarity_score": round(overall_similarity, 3),
-            "breakdown": {
-                "structural": round(structural_sim, 3),
-                "tag_overlap": round(tag_sim, 3),
-                "pattern_match": round(pattern_sim, 3)
-            },
+            "breakdown": breakdown,
             "explanation": explanation,
-            "verdict": verdict,
-            "details": {
+            "verdict": verdict
+        }
+        
+        if detail_level == "full":
+            # Features are cached and shared, so the report gets its own copies
+            report["details"] = deepcopy({
                 "canonical1": canonical1,
                 "canonical2": canonical2,
                 "fingerprint1": fingerprint1,
                 "fingerprint2": fingerprint2,
                 "tags1": tags1,
                 "tags2": tags2
+            })
+        
+        return report
+    
+    def _build_bound_report(self, structure1: Tuple[Dict[str, Any], Dict[str, Any], FingerprintVector],
+                            structure2: Tuple[Dict[str, Any], Dict[str, Any], FingerprintVector],
+                            structural_sim: float, pattern_sim: float,
+                            detail_level: DetailLevel = "full") -> Dict[str, Any]:
+        """Build a "below_threshold" report for untagged prompts, scored with a perfect tag overlap."""
+        canonical1, fingerprint1 = structure1[0], structure1[1]
+        canonical2, fingerprint2 = structure2[0], structure2[1]
+        
+        report = {
+            "similarity_score": round(self._weighted_score(structural_sim, 1.0, pattern_sim), 3),
+            "breakdown": {
+                "structural": round(structural_sim, 3),
+                "pattern_match": round(pattern_sim, 3),
+                # Not measured: the perfect overlap the score bound assumes
+                "tag_overlap_bound": 1.0
             }
         }
+        
+        if detail_level != "score":
+            report["explanation"] = self._generate_explanation(
+                canonical1, canonical2, fingerprint1, fingerprint2, {}, {}, []
+            )
+        
+        report["verdict"] = "below_threshold"
+        
+        if detail_level == "full":
+            report["details"] = deepcopy({
+                "canonical1": canonical1,
+                "canonical2": canonical2,
+                "fingerprint1": fingerprint1,
+                "fingerprint2": fingerprint2,
+                "tags1": {},
+                "tags2": {}
+            })
+        
+        return report
+    
+    def _weighted_score(self, structural_sim: float, tag_sim: float, pattern_sim: float) -> float:
+        """Combine component similarities into the overall score."""
+        return (
+            structural_sim * self.STRUCTURAL_WEIGHT +
+            tag_sim * self.TAG_WEIGHT +
+            pattern_sim * self.PATTERN_WEIGHT
+        )
     
     def _compare_patterns(self, canonical1: Dict[str, Any], canonical2: Dict[str, Any]) -> float:
         """Compare interaction patterns between two canonicals."""
@@ -99,17 +443,7 @@ class SimilarityScorer:
             return 1.0
         
         # Some patterns are similar
-        similar_patterns = {
-            "conversational": ["instructional"],
-            "instructional": ["conversational", "example_based"],
-            "template": ["list"],
-            "list": ["template"]
-        }
-        
-        if pattern2 in similar_patterns.get(pattern1, []):
-            return 0.6
-        
-        return 0.0
+        return _PATTERN_SIMILARITY.get((pattern1, pattern2), 0.0)
     
     def _generate_explanation(self, canonical1: Dict[str, Any], canonical2: Dict[str, Any],
                             fingerprint1: Dict[str, Any], fingerprint2: Dict[str, Any],
@@ -174,23 +508,224 @@ class SimilarityScorer:
             return "no_similarity"
     
     def batch_compare(self, prompts: List[Tuple[str, str]], 
-                     threshold: float = 0.65) -> List[Dict[str, Any]]:
+                     threshold: float = 0.65, n_jobs: int = 1,
+                     detail_level: DetailLevel = "summary",
+                     chunk_size: int = 100) -> List[Dict[str, Any]]:
         """
         Compare multiple prompt pairs in batch.
         
+        With n_jobs > 1 the pairs are split into chunks that worker
+        processes preprocess and compare independently; chunks of ~100
+        pairs keep the per-task pickling overhead small.
+        
         Args:
             prompts: List of (text1, text2) tuples
             threshold: Minimum similarity to report
+            n_jobs: Number of worker processes (-1 for all CPUs, 1 to run serially)
+            detail_level: Report detail (see `compare_features`); the raw
+                `details` are omitted by default to keep large batches small
+            chunk_size: Number of pairs compared per worker task
             
         Returns:
             List of similarity reports for pairs above threshold
         """
+        if n_jobs < 0:
+            n_jobs = os.cpu_count() or 1
+        
+        prompts = list(prompts)
+        
+        if n_jobs > 1 and len(prompts) > chunk_size:
+            tasks = [
+                (start, prompts[start:start + chunk_size], threshold, detail_level)
+                for start in range(0, len(prompts), chunk_size)
+            ]
+            results = []
+            with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_preprocess_worker,
+                                     initargs=(self,)) as executor:
+                for chunk_results in executor.map(_compare_chunk, tasks):
+                    results.extend(chunk_results)
+            return results
+        
+        return self._compare_prompt_pairs(prompts, threshold, detail_level)
+    
+    def _compare_prompt_pairs(self, prompts: List[Tuple[str, str]], threshold: float,
+                              detail_level: DetailLevel, start: int = 0) -> List[Dict[str, Any]]:
+        """Compare prompt pairs, keeping reports above threshold; indices count from `start`."""
         results = []
         
-        for i, (text1, text2) in enumerate(prompts):
-            result = self.compare(text1, text2)
+        for i, (text1, text2) in enumerate(prompts, start):
+            result = self.compare(text1, text2, threshold=threshold, detail_level=detail_level)
             if result["similarity_score"] >= threshold:
                 result["pair_index"] = i
                 results.append(result)
         
         return results
+    
+    def similarity_matrix(self, prompts_a: List[str], prompts_b: List[str],
+                          n_jobs: int = 1) -> List[List[float]]:
+        """
+        Score every prompt of one list against every prompt of another.
+        
+        Each distinct prompt is preprocessed once and pairs share the
+        structural score memo of `find_similar`, so an N x M comparison
+        costs N + M preprocessing passes rather than N * M.
+        
+        Args:
+            prompts_a: First list of prompts
+            prompts_b: Second list of prompts
+            n_jobs: Number of worker processes for preprocessing
+                (-1 for all CPUs, 1 to run serially)
+            
+        Returns:
+            Matrix (list of rows) of overall similarity scores, with
+            `result[i][j]` the score of prompts_a[i] against prompts_b[j]
+        """
+        features = self.preprocess_many(list(prompts_a) + list(prompts_b), n_jobs=n_jobs)
+        offset = len(prompts_a)
+        pairs = [(i, offset + j) for i in range(offset) for j in range(len(prompts_b))]
+        
+        scores = [[0.0] * len(prompts_b) for _ in range(offset)]
+        for i, j, score in self._score_pairs(features, pairs, 0.0, scores_only=True):
+            scores[i][j - offset] = score
+        
+        return scores
+    
+    def find_similar(self, texts: List[str], threshold: float = 0.65,
+                     pairs: Optional[Iterable[Tuple[int, int]]] = None,
+                     progress: Optional[Callable[[int, int], None]] = None,
+                     n_jobs: int = 1, chunk_size: int = 100,
+                     scores_only: bool = False) -> List[Any]:
+        """
+        Find all pairs of texts whose similarity reaches a threshold.
+        
+        Every text is preprocessed once and each pair is scored in stages,
+        cheapest first. Tag overlap carries half of the overall score, so pairs
+        whose tag overlap cannot reach the threshold even with perfect
+        structural and pattern scores are dropped first; structural and
+        pattern scores are computed only for the remainder, and the full
+        report (explanation and details) only for pairs that pass. Results
+        are identical to comparing every pair.
+        
+        Args:
+            texts: List of prompt texts
+            threshold: Minimum similarity to report
+            pairs: Optional (i, j) index pairs to consider (defaults to all pairs)
+            progress: Optional callback receiving (checked, total) pair counts
+            n_jobs: Number of worker processes (-1 for all CPUs, 1 to run serially)
+            chunk_size: Number of pairs scored per worker task
+            scores_only: Return (i, j, similarity_score) tuples instead of reports
+            
+        Returns:
+            List of similarity reports with `index1`/`index2` set, or
+            (i, j, similarity_score) tuples if `scores_only` is set
+        """
+        features = self.preprocess_many(texts, n_jobs=n_jobs)
+        
+        if pairs is None:
+            pairs = combinations(range(len(texts)), 2)
+        pairs = list(pairs)
+        
+        if n_jobs < 0:
+            n_jobs = os.cpu_count() or 1
+        
+        chunks = [pairs[k:k + chunk_size] for k in range(0, len(pairs), chunk_size)]
+        
+        structure_ids = self._structure_ids(features)
+        structure_memo: Dict[Tuple[int, int], Tuple[float, float]] = {}
+        
+        results = []
+        checked = 0
+        
+        if n_jobs > 1 and len(chunks) > 1:
+            with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker,
+                                     initargs=(self, features, structure_ids,
+                                               threshold, scores_only)) as executor:
+                scored_chunks = executor.map(_score_chunk, chunks)
+                for chunk, chunk_results in zip(chunks, scored_chunks):
+                    results.extend(chunk_results)
+                    checked += len(chunk)
+                    if progress:
+                        progress(checked, len(pairs))
+        else:
+            for chunk in chunks:
+                results.extend(self._score_pairs(features, chunk, threshold, scores_only,
+                                                 structure_ids, structure_memo))
+                checked += len(chunk)
+                if progress:
+                    progress(checked, len(pairs))
+        
+        if progress and not pairs:
+            progress(0, 0)
+        
+        return results
+    
+    @staticmethod
+    def _structure_ids(features: List[DocFeatures]) -> List[int]:
+        """
+        Number the distinct fingerprint vectors of a corpus.
+        
+        Fingerprints are coarse, so large corpora have few distinct ones;
+        structural and pattern similarity depend only on them and can be
+        remembered per pair of ids.
+        """
+        ids: Dict[FingerprintVector, int] = {}
+        return [ids.setdefault(f.fingerprint_vector, len(ids)) for f in features]
+    
+    def _score_pairs(self, features: List[DocFeatures], pairs: List[Tuple[int, int]],
+                     threshold: float, scores_only: bool = False,
+                     structure_ids: Optional[List[int]] = None,
+                     structure_memo: Optional[Dict[Tuple[int, int], Tuple[float, float]]] = None) -> List[Any]:
+        """Score index pairs of preprocessed texts, keeping those above threshold."""
+        if structure_ids is None:
+            structure_ids = self._structure_ids(features)
+        if structure_memo is None:
+            structure_memo = {}
+        memo_size = self.STRUCTURE_MEMO_SIZE
+        
+        # Best reachable score is max_other + tag_sim * TAG_WEIGHT; allow for
+        # rounding of the reported score to 3 decimals
+        max_other = self.STRUCTURAL_WEIGHT + self.PATTERN_WEIGHT
+        min_tag_sim = (threshold - 0.0005 - max_other) / self.TAG_WEIGHT
+        
+        # Bound methods are looked up once, outside the per-pair loop
+        compare_tag_masks = self.tagger.compare_tag_masks
+        compare_vectors = self.fingerprinter.compare_vectors
+        compare_patterns = self._compare_patterns
+        weighted_score = self._weighted_score
+        
+        results = []
+        
+        for i, j in pairs:
+            features1, features2 = features[i], features[j]
+            tag_sim, matched_mask = compare_tag_masks(features1.tag_masks, features2.tag_masks)
+            
+            if tag_sim < min_tag_sim:
+                continue
+            
+            # Structural and pattern similarity only depend on the fingerprints
+            structure_key = (structure_ids[i], structure_ids[j])
+            structure_sims = structure_memo.get(structure_key)
+            if structure_sims is None:
+                structure_sims = (
+                    compare_vectors(features1.fingerprint_vector, features2.fingerprint_vector),
+                    compare_patterns(features1.canonical, features2.canonical)
+                )
+                if len(structure_memo) < memo_size:
+                    structure_memo[structure_key] = structure_sims
+            
+            structural_sim, pattern_sim = structure_sims
+            score = round(weighted_score(structural_sim, tag_sim, pattern_sim), 3)
+            
+            if score < threshold:
+                continue
+            
+            if scores_only:
+                results.append((i, j, score))
+            else:
+                result = self._build_report(features1, features2, structural_sim, tag_sim,
+                                            pattern_sim, self.tagger.mask_tags(matched_mask))
+                result["index1"] = i
+                result["index2"] = j
+                results.append(result)
+        
+        return results
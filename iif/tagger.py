@@ -4,8 +4,8 @@ Layer 3: Intent Tagging System
 Maps canonical representations to controlled intent tags.
 """
 
-from typing import Dict, List, Any, Tuple
-from .utils import load_vocabulary, extract_keywords
+from typing import Dict, FrozenSet, List, Any, Optional, Tuple
+from .utils import load_vocabulary, normalize_keywords, normalize_text, popcount, KeywordMatcher
 
 
 class IntentTagger:
@@ -16,6 +16,34 @@ class IntentTagger:
     def __init__(self):
         """Initialize the tagger with intent vocabulary."""
         self.intent_tags = load_vocabulary("intent_tags")
+        
+        # Rules compiled once into the form tag() consumes, in vocabulary
+        # order: (tag_name, required fields, keyword count, base score).
+        # Tags with at most one required field have a fixed base score
+        # (0.3 without requirements, 0.6 once the field is present) and are
+        # scored inline; base is None for tags needing the general evaluator.
+        self._tag_rules: List[Tuple[str, Tuple[str, ...], int, Optional[float]]] = []
+        
+        # Tags each normalized keyword belongs to (repeated if listed twice
+        # in a tag), so hits are counted per tag from one scan of the text
+        self._keyword_tags: Dict[str, List[str]] = {}
+        
+        for tag_name, tag_data in self.intent_tags.items():
+            rules = tag_data.get("rules", {})
+            keywords = normalize_keywords(tuple(rules.get("keywords", [])))
+            
+            required = tuple(rules.get("required", []))
+            base = {0: 0.3, 1: 0.6}.get(len(required))
+            self._tag_rules.append((tag_name, required, len(keywords), base))
+            for keyword in keywords:
+                self._keyword_tags.setdefault(keyword, []).append(tag_name)
+        
+        self._keyword_matcher = KeywordMatcher(self._keyword_tags, normalize=False)
+        
+        # One bit per tag, in vocabulary order, for mask-based tag comparison
+        self._tag_bits: Dict[str, int] = {
+            tag_name: 1 << i for i, tag_name in enumerate(self.intent_tags)
+        }
     
     def tag(self, canonical: Dict[str, Any], text: str = "") -> Dict[str, Any]:
         """
@@ -30,9 +58,27 @@ class IntentTagger:
         """
         tag_scores = {}
         
+        # Find every vocabulary keyword in the text in one pass and count
+        # the hits of each tag
+        keyword_hits: Dict[str, int] = {}
+        if text:
+            for keyword in self._keyword_matcher.find(normalize_text(text)):
+                for tag_name in self._keyword_tags[keyword]:
+                    keyword_hits[tag_name] = keyword_hits.get(tag_name, 0) + 1
+        
         # Evaluate each tag
-        for tag_name, tag_data in self.intent_tags.items():
-            score = self._evaluate_tag(tag_name, tag_data, canonical, text)
+        for tag_name, required, keyword_count, base in self._tag_rules:
+            hits = keyword_hits.get(tag_name, 0)
+            
+            if base is None:
+                score = self._evaluate_tag(required, keyword_count, canonical, hits)
+            elif required and not canonical.get(required[0]):
+                continue  # Required field not met, tag doesn't apply
+            else:
+                score = base + hits / keyword_count * 0.4 if hits else base
+                if score > 1.0:
+                    score = 1.0
+            
             if score > 0:
                 tag_scores[tag_name] = score
         
@@ -49,19 +95,21 @@ class IntentTagger:
             "confidence": dict(sorted_tags)
         }
     
-    def _evaluate_tag(self, tag_name: str, tag_data: Dict[str, Any], 
-                     canonical: Dict[str, Any], text: str) -> float:
+    def _evaluate_tag(self, required: Tuple[str, ...], keyword_count: int,
+                     canonical: Dict[str, Any], keyword_hits: int) -> float:
         """
         Evaluate how well a tag matches the canonical representation.
         
+        `required` and `keyword_count` come from the tag's rules;
+        `keyword_hits` is the number of its keywords present in the
+        original text.
+        
         Returns:
             Confidence score (0.0 to 1.0)
         """
         score = 0.0
-        rules = tag_data.get("rules", {})
         
         # Check required fields
-        required = rules.get("required", [])
         required_met = 0
         for field in required:
             if field in canonical and canonical[field]:
@@ -76,12 +124,9 @@ class IntentTagger:
             score += 0.3  # Base score if no requirements
         
         # Check keywords
-        keywords = rules.get("keywords", [])
-        if keywords and text:
-            found_keywords = extract_keywords(text, keywords)
-            if found_keywords:
-                keyword_score = len(found_keywords) / len(keywords)
-                score += keyword_score * 0.4
+        if keyword_hits:
+            keyword_score = keyword_hits / keyword_count
+            score += keyword_score * 0.4
         
         return min(score, 1.0)
     
@@ -96,11 +141,93 @@ class IntentTagger:
         Returns:
             Tuple of (similarity_score, matched_tags)
         """
-        primary1 = set(tags1.get("primary_tags", []))
-        primary2 = set(tags2.get("primary_tags", []))
+        return self.compare_tag_sets(self.tag_sets(tags1), self.tag_sets(tags2))
+    
+    def tag_sets(self, tags: Dict[str, Any]) -> Tuple[FrozenSet[str], FrozenSet[str]]:
+        """
+        Convert a tag set into (primary, secondary) frozensets.
         
-        secondary1 = set(tags1.get("secondary_tags", []))
-        secondary2 = set(tags2.get("secondary_tags", []))
+        Computing these once per document lets repeated comparisons skip
+        rebuilding the sets for every pair.
+        """
+        return (
+            frozenset(tags.get("primary_tags", [])),
+            frozenset(tags.get("secondary_tags", []))
+        )
+    
+    def tag_masks(self, tags: Dict[str, Any]) -> Tuple[int, int]:
+        """
+        Convert a tag set into (primary, secondary) bit masks over the vocabulary.
+        
+        Tags not in the vocabulary are assigned new bits on first use.
+        """
+        tag_bits = self._tag_bits
+        masks = []
+        
+        for key in ("primary_tags", "secondary_tags"):
+            mask = 0
+            for tag_name in tags.get(key, []):
+                bit = tag_bits.get(tag_name)
+                if bit is None:
+                    bit = tag_bits[tag_name] = 1 << len(tag_bits)
+                mask |= bit
+            masks.append(mask)
+        
+        return masks[0], masks[1]
+    
+    def mask_tags(self, mask: int) -> List[str]:
+        """List the tag names set in a mask, in vocabulary order."""
+        return [tag_name for tag_name, bit in self._tag_bits.items() if mask & bit]
+    
+    def compare_tag_masks(self, masks1: Tuple[int, int],
+                          masks2: Tuple[int, int]) -> Tuple[float, int]:
+        """
+        Compare two (primary, secondary) tag mask pairs.
+        
+        Same score as `compare_tag_sets`, with set operations replaced by
+        bitwise ones.
+        
+        Args:
+            masks1: First tag masks (from `tag_masks`)
+            masks2: Second tag masks (from `tag_masks`)
+            
+        Returns:
+            Tuple of (similarity_score, matched_mask); see `mask_tags`
+        """
+        primary1, secondary1 = masks1
+        primary2, secondary2 = masks2
+        
+        primary_intersection = primary1 & primary2
+        primary_union = primary1 | primary2
+        primary_similarity = (
+            popcount(primary_intersection) / popcount(primary_union) if primary_union else 0.0
+        )
+        
+        secondary_intersection = secondary1 & secondary2
+        secondary_union = secondary1 | secondary2
+        secondary_similarity = (
+            popcount(secondary_intersection) / popcount(secondary_union) if secondary_union else 0.0
+        )
+        
+        # Weighted combination (primary tags matter more)
+        overall_similarity = (primary_similarity * 0.7) + (secondary_similarity * 0.3)
+        
+        return overall_similarity, primary_intersection | secondary_intersection
+    
+    def compare_tag_sets(self, sets1: Tuple[FrozenSet[str], FrozenSet[str]],
+                         sets2: Tuple[FrozenSet[str], FrozenSet[str]]) -> Tuple[float, List[str]]:
+        """
+        Compare two precomputed (primary, secondary) tag set pairs.
+        
+        Args:
+            sets1: First tag sets (from `tag_sets`)
+            sets2: Second tag sets (from `tag_sets`)
+            
+        Returns:
+            Tuple of (similarity_score, matched_tags)
+        """
+        primary1, secondary1 = sets1
+        primary2, secondary2 = sets2
         
         # Calculate Jaccard similarity for primary tags (weighted more)
         primary_intersection = primary1.intersection(primary2)
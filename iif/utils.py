@@ -2,29 +2,70 @@
 Shared utility functions for the IIF framework.
 """
 
-import re
 import json
-from typing import Any, Dict, List
+import math
+from functools import lru_cache
+from operator import mul
+from typing import Any, Dict, Iterable, List, Set, Tuple
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from ._kernels import cosine as _compiled_cosine
+
+# Vocabulary files live next to the package, in the repository root
+_VOCAB_DIR = Path(__file__).resolve().parent.parent / "vocabularies"
+
 
 def load_vocabulary(vocab_name: str) -> Dict[str, Any]:
     """
     Load a vocabulary file from the vocabularies directory.
     
+    Each file is parsed once and cached until it changes on disk, so the
+    returned dictionary is shared between callers and must not be mutated.
+    
     Args:
         vocab_name: Name of the vocabulary file (without .json extension)
         
     Returns:
         Dictionary containing the vocabulary data
     """
-    vocab_path = Path(__file__).parent.parent / "vocabularies" / f"{vocab_name}.json"
+    vocab_path = _VOCAB_DIR / f"{vocab_name}.json"
+    
+    try:
+        modified = vocab_path.stat().st_mtime_ns
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Vocabulary file not found: {vocab_path}") from None
+    
+    return _read_vocabulary(vocab_path, modified)
+
+
+@lru_cache(maxsize=32)
+def _read_vocabulary(vocab_path: Path, modified: int) -> Dict[str, Any]:
+    """Parse a vocabulary file; `modified` keys the cache on the file's mtime."""
+    data = vocab_path.read_bytes()
     
-    if not vocab_path.exists():
-        raise FileNotFoundError(f"Vocabulary file not found: {vocab_path}")
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def collapse_whitespace(text: str) -> str:
+    """
+    Collapse runs of whitespace to single spaces and strip both ends.
     
-    with open(vocab_path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    Args:
+        text: Input text
+        
+    Returns:
+        Text with normalized whitespace
+    """
+    # str.split() splits on exactly the characters re's \s matches,
+    # without the regex engine
+    return ' '.join(text.split())
 
 
 def normalize_text(text: str) -> str:
@@ -37,13 +78,8 @@ def normalize_text(text: str) -> str:
     Returns:
         Normalized text
     """
-    # Remove extra whitespace
-    text = re.sub(r'\s+', ' ', text)
-    # Strip leading/trailing whitespace
-    text = text.strip()
-    # Convert to lowercase
-    text = text.lower()
-    return text
+    # Collapse and strip whitespace, then convert to lowercase
+    return collapse_whitespace(text).lower()
 
 
 def extract_keywords(text: str, keywords: List[str]) -> List[str]:
@@ -57,39 +93,221 @@ def extract_keywords(text: str, keywords: List[str]) -> List[str]:
     Returns:
         List of found keywords
     """
-    normalized = normalize_text(text)
-    found = []
+    keywords = tuple(keywords)
+    matcher, normalized_keywords = _compile_keywords(keywords)
+    found = matcher.find(normalize_text(text))
+    
+    return [
+        keyword for keyword, normalized in zip(keywords, normalized_keywords)
+        if normalized in found
+    ]
+
+
+@lru_cache(maxsize=128)
+def _compile_keywords(keywords: Tuple[str, ...]) -> Tuple["KeywordMatcher", Tuple[str, ...]]:
+    """Build (and cache) a matcher and the normalized forms for a keyword list."""
+    normalized_keywords = normalize_keywords(keywords)
+    return KeywordMatcher(normalized_keywords, normalize=False), normalized_keywords
+
+
+@lru_cache(maxsize=256)
+def normalize_keywords(keywords: Tuple[str, ...]) -> Tuple[str, ...]:
+    """
+    Normalize a keyword list with `normalize_text`.
     
-    for keyword in keywords:
-        if normalize_text(keyword) in normalized:
-            found.append(keyword)
+    Results are cached, so keyword lists from (cached) vocabularies are
+    normalized once per process rather than on every construction.
     
-    return found
+    Args:
+        keywords: Keywords to normalize
+        
+    Returns:
+        Normalized keywords, in the same order
+    """
+    return tuple(normalize_text(keyword) for keyword in keywords)
 
 
-def jaccard_similarity(set1: set, set2: set) -> float:
+class KeywordMatcher:
+    """
+    Finds which of a fixed set of keywords occur in a text.
+    
+    Matching follows `extract_keywords`: a keyword is found when its
+    normalized form is a substring of the normalized text. With the optional
+    `pyahocorasick` package all keywords are found in a single pass over the
+    text; otherwise each distinct keyword is checked once.
+    
+    With `normalize=False` keywords are matched exactly as given, for
+    callers that prepare the text themselves.
+    """
+    
+    def __init__(self, keywords: Iterable[str], normalize: bool = True):
+        """
+        Build the matcher.
+        
+        Args:
+            keywords: Keywords to search for
+            normalize: Whether to normalize keywords on construction
+        """
+        if normalize:
+            keywords = (normalize_text(k) for k in keywords)
+        
+        # Deduplicate while keeping vocabulary order
+        self.keywords = list(dict.fromkeys(keywords))
+        self._automaton = None
+        
+        try:
+            import ahocorasick
+        except ImportError:
+            return
+        
+        automaton = ahocorasick.Automaton()
+        for keyword in self.keywords:
+            if keyword:
+                automaton.add_word(keyword, keyword)
+        
+        if len(automaton):
+            automaton.make_automaton()
+            self._automaton = automaton
+    
+    def find(self, normalized_text: str) -> Set[str]:
+        """
+        Find the keywords occurring in already-normalized text.
+        
+        Args:
+            normalized_text: Text passed through `normalize_text` (or
+                prepared by the caller when `normalize=False`)
+            
+        Returns:
+            Set of keywords found
+        """
+        if self._automaton is None:
+            return {keyword for keyword in self.keywords if keyword in normalized_text}
+        
+        found = {keyword for _, keyword in self._automaton.iter(normalized_text)}
+        
+        # The automaton cannot hold the empty keyword, which matches any text
+        if "" in self.keywords:
+            found.add("")
+        
+        return found
+
+
+if hasattr(int, "bit_count"):
+    # Python 3.10+: a single popcount instruction
+    popcount = int.bit_count
+else:
+    def popcount(mask: int) -> int:
+        """
+        Count the set bits of a non-negative integer.
+        
+        Args:
+            mask: Bit mask
+            
+        Returns:
+            Number of 1 bits
+        """
+        return bin(mask).count("1")
+
+
+def to_bitset(tokens: Iterable[str], index: Dict[str, int]) -> int:
+    """
+    Encode a set of tokens as an integer bitset.
+    
+    Args:
+        tokens: Tokens to encode
+        index: Token -> bit position mapping; unknown tokens are assigned
+            the next free position
+        
+    Returns:
+        Bit mask with one bit set per distinct token
+    """
+    mask = 0
+    
+    for token in tokens:
+        position = index.get(token)
+        if position is None:
+            position = index[token] = len(index)
+        mask |= 1 << position
+    
+    return mask
+
+
+def jaccard_bitset(mask1: int, mask2: int) -> float:
+    """
+    Jaccard similarity of two bitsets built with `to_bitset`.
+    
+    Same result as `jaccard_similarity` on the underlying sets. Bitsets
+    of any width work: AND/OR and the popcount run in C over the int's
+    internal digits, so large vocabularies need no separate code path.
+    
+    Args:
+        mask1: First bitset
+        mask2: Second bitset
+        
+    Returns:
+        Jaccard similarity score (0.0 to 1.0)
+    """
+    union = mask1 | mask2
+    
+    if not union:
+        return 1.0
+    
+    return popcount(mask1 & mask2) / popcount(union)
+
+
+def jaccard_similarity(set1: set, set2: set, threshold: float = 0.0) -> float:
     """
     Calculate Jaccard similarity between two sets.
     
+    Sets may also be given as integer bitsets (see `to_bitset`), which are
+    compared with popcounts instead of hashing.
+    
     Args:
         set1: First set
         set2: Second set
+        threshold: Scores below this may be reported as 0.0; pairs whose
+            sizes alone rule it out (Jaccard <= min size / max size) are
+            then skipped without intersecting
         
     Returns:
         Jaccard similarity score (0.0 to 1.0)
     """
+    if type(set1) is int and type(set2) is int:
+        return jaccard_bitset(set1, set2)
+    
+    if threshold > 0.0:
+        size1, size2 = len(set1), len(set2)
+        if size1 and size2 and min(size1, size2) < threshold * max(size1, size2):
+            return 0.0
+    
+    # Frozensets are hashable (and cache their hash), so scores for
+    # repeated pairs, e.g. per-document sets compared many times, are memoized
+    if type(set1) is frozenset and type(set2) is frozenset:
+        return _jaccard_frozen(set1, set2)
+    
+    return _jaccard(set1, set2)
+
+
+def _jaccard(set1: set, set2: set) -> float:
+    """Uncached Jaccard similarity; see `jaccard_similarity`."""
     if not set1 and not set2:
         return 1.0
     
     if not set1 or not set2:
         return 0.0
     
-    intersection = len(set1.intersection(set2))
-    union = len(set1.union(set2))
+    # |A | B| = |A| + |B| - |A & B|: one set operation instead of two.
+    # set & already probes from the smaller operand in C; an explicit
+    # counting loop avoids the result set but is slower for small sets.
+    intersection = len(set1 & set2)
+    union = len(set1) + len(set2) - intersection
     
     return intersection / union if union > 0 else 0.0
 
 
+_jaccard_frozen = lru_cache(maxsize=4096)(_jaccard)
+
+
 def cosine_similarity(vec1: List[float], vec2: List[float]) -> float:
     """
     Calculate cosine similarity between two vectors.
@@ -104,11 +322,70 @@ def cosine_similarity(vec1: List[float], vec2: List[float]) -> float:
     if len(vec1) != len(vec2):
         raise ValueError("Vectors must have the same length")
     
-    dot_product = sum(a * b for a, b in zip(vec1, vec2))
-    magnitude1 = sum(a * a for a in vec1) ** 0.5
-    magnitude2 = sum(b * b for b in vec2) ** 0.5
+    if hasattr(vec1, "dot") and hasattr(vec2, "dot"):
+        # numpy arrays (e.g. from Embedder.embed_many): a fused compiled
+        # kernel when available, otherwise their BLAS dot
+        if _compiled_cosine is not None:
+            similarity = _compiled_cosine(vec1, vec2)
+            if similarity is not None:
+                return similarity
+        
+        dot_product = float(vec1.dot(vec2))
+        squared1 = float(vec1.dot(vec1))
+        squared2 = float(vec2.dot(vec2))
+    else:
+        dot_product = sum(map(mul, vec1, vec2))
+        squared1 = sum(map(mul, vec1, vec1))
+        squared2 = sum(map(mul, vec2, vec2))
     
-    if magnitude1 == 0 or magnitude2 == 0:
+    if squared1 == 0 or squared2 == 0:
         return 0.0
     
-    return dot_product / (magnitude1 * magnitude2)
+    # One square root per magnitude: their product could underflow to 0.0
+    return dot_product / (math.sqrt(squared1) * math.sqrt(squared2))
+
+
+def cosine_similarity_matrix(rows1: Any, rows2: Any, dtype: Any = None) -> Any:
+    """
+    Calculate cosine similarity between every pair of rows from two matrices.
+    
+    Each row is normalized once, so all pairs cost one dot product each.
+    numpy arrays are scored with a single matrix product; other sequences of
+    vectors in pure Python. Zero rows score 0.0, as in `cosine_similarity`.
+    
+    Args:
+        rows1: First matrix (sequence of vectors, or 2-D numpy array)
+        rows2: Second matrix with the same vector length
+        dtype: numpy dtype the normalized rows are stored in, e.g.
+            np.float16 to halve their memory traffic; products still
+            accumulate in float32 (numpy inputs only)
+        
+    Returns:
+        Matrix of shape (len(rows1), len(rows2)): a numpy array for numpy
+        inputs, otherwise a list of lists
+    """
+    if hasattr(rows1, "ndim") and hasattr(rows2, "ndim"):
+        import numpy as np
+        
+        def unit_rows(matrix):
+            matrix = np.asarray(matrix, dtype=np.float32)
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            unit = matrix / np.where(norms == 0, 1, norms)
+            return unit if dtype is None else unit.astype(dtype)
+        
+        return np.matmul(unit_rows(rows1), unit_rows(rows2).T, dtype=np.float32)
+    
+    def unit_rows(matrix):
+        unit = []
+        for vector in matrix:
+            norm = math.sqrt(sum(map(mul, vector, vector)))
+            unit.append([v / norm for v in vector] if norm else [0.0] * len(vector))
+        return unit
+    
+    unit1, unit2 = unit_rows(rows1), unit_rows(rows2)
+    
+    # Every row, not just the first: zip() would silently truncate a ragged one
+    if len({len(vector) for vector in unit1} | {len(vector) for vector in unit2}) > 1:
+        raise ValueError("Vectors must have the same length")
+    
+    return [[sum(map(mul, vector1, vector2)) for vector2 in unit2] for vector1 in unit1]
@@ -2,7 +2,7 @@
 Setup configuration for the Intent Identity Framework (IIF).
 """
 
-from setuptools import setup, find_packages
+from setuptools import Extension, setup, find_packages
 from pathlib import Path
 
 # Read README
@@ -18,6 +18,15 @@ setup(
     long_description_content_type="text/markdown",
     url="https://github.com/yourusername/DuplicateDetector",
     packages=find_packages(),
+    # Optional C cosine kernel; skipped (pure-Python fallback) if it fails to build
+    ext_modules=[
+        Extension(
+            "iif._csim",
+            sources=["iif/_csim.c"],
+            extra_compile_args=["-O3", "-fopenmp-simd"],
+            optional=True,
+        ),
+    ],
     classifiers=[
         "Development Status :: 3 - Alpha",
         "Intended Audience :: Developers",
@@ -37,6 +46,15 @@ setup(
         "embeddings": [
             "sentence-transformers>=2.2.0",
         ],
+        "embeddings-onnx": [
+            "sentence-transformers>=3.2.0",
+            "optimum[onnxruntime]>=1.23.0",
+        ],
+        "fast": [
+            "orjson>=3.6.0",
+            "pyahocorasick>=2.0.0",
+            "numba>=0.57.0",
+        ],
         "dev": [
             "pytest>=7.0.0",
             "pytest-cov>=4.0.0",
@@ -3,14 +3,15 @@ Test suite for the Canonicalizer (Layer 1).
 """
 
 import pytest
-from iif.canonicalizer import Canonicalizer
+from iif.canonicalizer import Canonicalizer, categorize_lengths
 
 
 class TestCanonicalizer:
     
-    def setup_method(self):
-        """Set up test fixtures."""
-        self.canonicalizer = Canonicalizer()
+    @classmethod
+    def setup_class(cls):
+        """Set up test fixtures (the canonicalizer is stateless, so it is shared)."""
+        cls.canonicalizer = Canonicalizer()
     
     def test_basic_roleplay_prompt(self):
         """Test canonicalization of a basic roleplay prompt."""
@@ -62,6 +63,10 @@ class TestCanonicalizer:
         assert short_result['metadata']['length'] == 'short'
         assert long_result['metadata']['length'] == 'long'
     
+    def test_categorize_lengths(self):
+        """Test length category boundaries for batches of word counts."""
+        assert categorize_lengths([0, 49, 50, 199, 200]) == ["short", "short", "medium", "medium", "long"]
+    
     def test_goal_inference(self):
         """Test goal inference from content."""
         creative_text = "Write a creative story about robots."
@@ -0,0 +1,123 @@
+"""
+Test suite for the dataset duplicate checker script.
+"""
+
+import pytest
+from check_duplicates import (
+    DisjointSet, DuplicatePairs, extract_conversations, find_duplicates, remove_duplicates
+)
+from iif import SimilarityScorer
+
+
+def make_dataset(user_texts):
+    """Build a chat dataset with one user message per entry."""
+    return [
+        {"messages": [{"role": "user", "content": text},
+                      {"role": "assistant", "content": "Sure."}]}
+        for text in user_texts
+    ]
+
+
+class TestFindDuplicates:
+    
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.conversations = extract_conversations(make_dataset([
+            "You are a helpful AI assistant. Answer questions clearly.",
+            "Act as a helpful assistant. Provide clear answers.",
+            "Write a poem about nature in the style of Robert Frost.",
+            "Generate a nature poem inspired by Robert Frost.",
+            "Extract all dates from text and format as YYYY-MM-DD.",
+            "You are Sheldon Cooper. Always say Bazinga after a joke.",
+            "Pretend to be Sheldon Cooper and end every joke with Bazinga.",
+        ]))
+    
+    def all_pairs(self, threshold):
+        """Score every pair with SimilarityScorer.compare, as a reference."""
+        scorer = SimilarityScorer()
+        found = {}
+        
+        for i, conversation1 in enumerate(self.conversations):
+            for j in range(i + 1, len(self.conversations)):
+                score = scorer.compare(conversation1['full'],
+                                       self.conversations[j]['full'])['similarity_score']
+                if score >= threshold:
+                    found[(i, j)] = score
+        
+        return found
+    
+    def test_matches_all_pairs(self):
+        """Test that paraphrased duplicates are found like comparing every pair."""
+        duplicates = find_duplicates(self.conversations, threshold=0.6, n_jobs=1)
+        
+        found = dict(zip(duplicates.pairs(), duplicates.similarity))
+        
+        assert found == self.all_pairs(0.6)
+        assert found
+    
+    def test_repeated_texts_match_all_pairs(self):
+        """Test that repeated texts are scored like any other pair, not as 1.0."""
+        texts = [conversation['user'] for conversation in self.conversations]
+        self.conversations = extract_conversations(make_dataset(texts + texts[:2] + texts[:1]))
+        
+        duplicates = find_duplicates(self.conversations, threshold=0.6, n_jobs=1)
+        
+        found = dict(zip(duplicates.pairs(), duplicates.similarity))
+        
+        assert found == self.all_pairs(0.6)
+        assert (0, 7) in found and (7, 9) in found
+        assert list(found) == sorted(found)
+        assert all(record['verdict'] != 'exact_duplicate' for record in duplicates)
+    
+    def test_lsh_is_subset(self):
+        """Test that the opt-in LSH prefilter only drops pairs, never adds them."""
+        expected = self.all_pairs(0.6)
+        
+        duplicates = find_duplicates(self.conversations, threshold=0.6, n_jobs=1, use_lsh=True)
+        
+        for pair, similarity in zip(duplicates.pairs(), duplicates.similarity):
+            assert expected[pair] == pytest.approx(similarity)
+
+
+class TestRemoveDuplicates:
+    
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.dataset = [{"id": idx} for idx in range(6)]
+        self.conversations = [{"index": idx} for idx in range(6)]
+    
+    def make_pairs(self, pairs):
+        """Build DuplicatePairs over dataset indices."""
+        duplicates = DuplicatePairs(self.conversations, scorer=None)
+        for index1, index2 in pairs:
+            duplicates.add(index1, index2, 0.9)
+        return duplicates
+    
+    def test_transitive_groups(self):
+        """Test that a~b and b~c keep only a."""
+        cleaned, removed = remove_duplicates(self.dataset, self.make_pairs([(0, 2), (2, 4)]))
+        
+        assert removed == [2, 4]
+        assert cleaned == [{"id": 0}, {"id": 1}, {"id": 3}, {"id": 5}]
+    
+    def test_keeps_first_occurrence(self):
+        """Test that the lowest index of a group is kept, whatever the pair order."""
+        cleaned, removed = remove_duplicates(self.dataset, self.make_pairs([(5, 3), (4, 1), (3, 1)]))
+        
+        assert removed == [3, 4, 5]
+        assert [item["id"] for item in cleaned] == [0, 1, 2]
+    
+    def test_no_duplicates(self):
+        """Test that an empty pair list keeps the dataset unchanged."""
+        cleaned, removed = remove_duplicates(self.dataset, self.make_pairs([]))
+        
+        assert removed == []
+        assert cleaned == self.dataset
+    
+    def test_disjoint_set_roots(self):
+        """Test that each set's root is its smallest member."""
+        groups = DisjointSet(5)
+        groups.union(4, 3)
+        groups.union(3, 1)
+        
+        assert [groups.find(x) for x in range(5)] == [0, 1, 2, 1, 1]
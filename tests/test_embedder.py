@@ -0,0 +1,207 @@
+"""
+Test suite for the embedding caches (Layer 5).
+"""
+
+import importlib.machinery
+import sys
+import types
+
+import pytest
+from iif.embedder import Embedder, MemoryCache, SQLiteCache
+
+
+class FakeVector(list):
+    """List with the numpy-style tolist() the embedder calls."""
+    
+    def tolist(self):
+        return list(self)
+
+
+class FakeSentenceTransformer:
+    """Stand-in model (sentence-transformers >= 3.2 signature) recording its calls."""
+    
+    def __init__(self, model_name, device=None, backend="torch", model_kwargs=None):
+        self.model_name = model_name
+        self.device = device
+        self.backend = backend
+        self.model_kwargs = model_kwargs
+        self.dtype = "fp32"
+        self.encoded = []
+    
+    def half(self):
+        self.dtype = "fp16"
+    
+    def get_sentence_embedding_dimension(self):
+        return 2
+    
+    def encode(self, texts, batch_size=32, convert_to_numpy=True,
+               normalize_embeddings=False, show_progress_bar=False):
+        if isinstance(texts, str):
+            self.encoded.append(texts)
+            return FakeVector([float(len(texts)), 1.0])
+        
+        import numpy as np
+        self.encoded.extend(texts)
+        vectors = np.asarray([[float(len(text)), 1.0] for text in texts], dtype=np.float32)
+        if normalize_embeddings:
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors
+
+
+class LegacySentenceTransformer(FakeSentenceTransformer):
+    """Stand-in for sentence-transformers < 3.2, which has no backend argument."""
+    
+    def __init__(self, model_name, device=None):
+        super().__init__(model_name, device)
+
+
+def install_module(monkeypatch, name, **attributes):
+    """Install a stub module that importlib can find."""
+    module = types.ModuleType(name)
+    module.__spec__ = importlib.machinery.ModuleSpec(name, None)
+    for attribute, value in attributes.items():
+        setattr(module, attribute, value)
+    monkeypatch.setitem(sys.modules, name, module)
+    return module
+
+
+@pytest.fixture
+def fake_sentence_transformers(monkeypatch):
+    """Install a stub sentence_transformers module without optimum."""
+    monkeypatch.setitem(sys.modules, "optimum", None)
+    return install_module(monkeypatch, "sentence_transformers",
+                          SentenceTransformer=FakeSentenceTransformer)
+
+
+class TestEmbeddingCache:
+    
+    def test_memory_cache_evicts_least_recent(self):
+        """Test LRU eviction in the in-memory cache."""
+        cache = MemoryCache(maxsize=2)
+        cache.set("a", [1.0])
+        cache.set("b", [2.0])
+        cache.get("a")
+        cache.set("c", [3.0])
+        
+        assert cache.get("a") == [1.0]
+        assert cache.get("b") is None
+        assert cache.get("c") == [3.0]
+    
+    def test_sqlite_cache_persists(self, tmp_path):
+        """Test that vectors survive reopening the database."""
+        path = str(tmp_path / "embeddings.db")
+        SQLiteCache(path).set("key", [0.5, -0.25])
+        
+        cache = SQLiteCache(path)
+        
+        assert cache.get("key") == [0.5, -0.25]
+        assert cache.get("missing") is None
+    
+    def test_memory_cache_copies(self):
+        """Test that modifying a returned or stored vector leaves the cache intact."""
+        cache = MemoryCache()
+        vector = [1.0, 2.0]
+        cache.set("a", vector)
+        vector.append(3.0)
+        cache.get("a").append(4.0)
+        
+        assert cache.get("a") == [1.0, 2.0]
+
+
+class TestEmbedder:
+    
+    def test_embed_returns_copy_of_cached_vector(self, fake_sentence_transformers):
+        """Test that mutating an embedding does not corrupt the cache."""
+        embedder = Embedder(cache=MemoryCache())
+        
+        embedder.embed("hello").append(99.0)
+        vector = embedder.embed("hello")
+        
+        assert vector == [5.0, 1.0]
+        assert embedder.model.encoded == ["hello"]
+    
+    def test_invalid_options(self, fake_sentence_transformers):
+        """Test that unknown or unsupported option combinations are rejected."""
+        with pytest.raises(ValueError):
+            Embedder(precision="int4")
+        with pytest.raises(ValueError):
+            Embedder(backend="tensorrt")
+        with pytest.raises(ValueError):
+            Embedder(backend="onnx", precision="fp16")
+    
+    def test_half_precision(self, fake_sentence_transformers):
+        """Test that fp16 converts the model and device is passed through."""
+        embedder = Embedder(precision="fp16", device="cpu")
+        
+        assert embedder.model.dtype == "fp16"
+        assert embedder.model.device == "cpu"
+    
+    def test_onnx_backend(self, fake_sentence_transformers, monkeypatch):
+        """Test that the onnx backend and model file reach the model."""
+        install_module(monkeypatch, "optimum")
+        install_module(monkeypatch, "onnxruntime")
+        
+        embedder = Embedder(backend="onnx", model_file="onnx/model_O4.onnx")
+        
+        assert embedder.backend == "onnx"
+        assert embedder.model.backend == "onnx"
+        assert embedder.model.model_kwargs == {"file_name": "onnx/model_O4.onnx"}
+    
+    def test_backend_falls_back_without_optimum(self, fake_sentence_transformers):
+        """Test the torch fallback when optimum is not installed."""
+        with pytest.warns(UserWarning, match="requires optimum"):
+            embedder = Embedder(backend="onnx")
+        
+        assert embedder.backend == "torch"
+        assert embedder.model.backend == "torch"
+    
+    def test_backend_falls_back_on_old_sentence_transformers(self, fake_sentence_transformers,
+                                                            monkeypatch):
+        """Test the torch fallback when sentence-transformers predates backend=."""
+        install_module(monkeypatch, "optimum")
+        install_module(monkeypatch, "openvino")
+        monkeypatch.setattr(fake_sentence_transformers, "SentenceTransformer",
+                            LegacySentenceTransformer)
+        
+        with pytest.warns(UserWarning, match="sentence-transformers>=3.2"):
+            embedder = Embedder(backend="openvino")
+        
+        assert embedder.backend == "torch"
+        assert isinstance(embedder.model, LegacySentenceTransformer)
+    
+    def test_embed_many_encodes_only_missing(self, fake_sentence_transformers):
+        """Test that cached texts are not encoded again in a batch."""
+        pytest.importorskip("numpy")
+        embedder = Embedder(cache=MemoryCache())
+        embedder.embed_many(["a", "bb"])
+        
+        vectors = embedder.embed_many(["bb", "ccc", "a"])
+        
+        assert embedder.model.encoded == ["a", "bb", "ccc"]
+        assert vectors.shape == (3, 2)
+    
+    def test_similarity_matrix(self, fake_sentence_transformers):
+        """Test that the matrix agrees with pairwise similarity."""
+        pytest.importorskip("numpy")
+        embedder = Embedder()
+        texts_a, texts_b = ["a", "bbbb"], ["cc", "a", "dddddd"]
+        
+        matrix = embedder.similarity_matrix(texts_a, texts_b)
+        
+        assert matrix.shape == (2, 3)
+        for i, text1 in enumerate(texts_a):
+            for j, text2 in enumerate(texts_b):
+                assert matrix[i, j] == pytest.approx(embedder.similarity(text1, text2))
+    
+    def test_empty_batch(self, fake_sentence_transformers):
+        """Test that empty input keeps the embedding width, with and without a cache."""
+        pytest.importorskip("numpy")
+        
+        for cache in (None, MemoryCache()):
+            embedder = Embedder(cache=cache)
+            
+            assert embedder.embed_many([]).shape == (0, 2)
+            assert embedder.similarity_matrix([], ["a", "bb"]).shape == (0, 2)
+            assert embedder.similarity_matrix(["a"], []).shape == (1, 0)
+            assert embedder.model.encoded == ["a"]
+
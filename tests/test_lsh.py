@@ -0,0 +1,54 @@
+"""
+Test suite for MinHash-LSH candidate generation.
+"""
+
+import pytest
+from iif.lsh import MinHash, MinHashLSH, candidate_pairs, shingle
+
+
+class TestMinHashLSH:
+
+    def test_shingle_short_text(self):
+        """Test that short texts form a single shingle."""
+        assert shingle("Hello   World") == {"hello world"}
+        assert shingle("") == set()
+
+    def test_shingle_word_windows(self):
+        """Test word shingle extraction."""
+        shingles = shingle("one two three four five six")
+
+        assert shingles == {"one two three four five", "two three four five six"}
+
+    def test_identical_signatures(self):
+        """Test that identical texts produce identical signatures."""
+        minhash = MinHash(num_perm=64)
+        text = "You are Sheldon Cooper. Always use the catchphrase Bazinga when joking."
+
+        assert minhash.signature(shingle(text)) == minhash.signature(shingle(text))
+
+    def test_query_finds_inserted(self):
+        """Test that an inserted signature collides with itself."""
+        minhash = MinHash()
+        lsh = MinHashLSH(threshold=0.6)
+        signature = minhash.signature(shingle("a b c d e f g h i j"))
+        lsh.insert("doc", signature)
+
+        assert lsh.query(signature) == {"doc"}
+
+    def test_signature_length_mismatch(self):
+        """Test that signatures of the wrong length are rejected."""
+        lsh = MinHashLSH(num_perm=128)
+
+        with pytest.raises(ValueError):
+            lsh.insert("doc", (1, 2, 3))
+
+    def test_candidate_pairs(self):
+        """Test that near-duplicates are candidates and unrelated texts are not."""
+        base = "you are a helpful assistant that answers questions about physics clearly and with examples"
+        texts = [
+            base,
+            "Write a poem about the ocean at night with vivid imagery and rhyme in every stanza",
+            base + " please",
+        ]
+
+        assert candidate_pairs(texts) == [(0, 2)]
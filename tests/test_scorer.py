@@ -2,6 +2,9 @@
 Test suite for the SimilarityScorer (Layer 4).
 """
 
+import os
+from copy import deepcopy
+
 import pytest
 from iif import SimilarityScorer
 
@@ -97,3 +100,247 @@ class TestSimilarityScorer:
         assert 'canonical2' in result['details']
         assert 'fingerprint1' in result['details']
         assert 'fingerprint2' in result['details']
+    
+    def test_compare_features_matches_compare(self):
+        """Test that comparing preprocessed features equals comparing texts."""
+        prompt1 = "You are Sheldon Cooper. Always use Bazinga!"
+        prompt2 = "Act as Sheldon Cooper. Use the catchphrase Bazinga!"
+        
+        features1 = self.scorer.preprocess(prompt1)
+        features2 = self.scorer.preprocess(prompt2)
+        
+        result = self.scorer.compare_features(features1, features2)
+        
+        assert result['similarity_score'] == self.scorer.compare(prompt1, prompt2)['similarity_score']
+        assert result['details']['tags1'] == features1.tags
+    
+    def test_find_similar_matches_pairwise(self):
+        """Test that find_similar reports the same pairs as comparing every pair."""
+        prompts = [
+            "You are a helpful AI assistant. Answer questions clearly.",
+            "Act as a helpful assistant. Provide clear answers.",
+            "Write a poem about nature in the style of Robert Frost.",
+            "Generate a nature poem inspired by Robert Frost.",
+            "Extract all dates from text and format as YYYY-MM-DD.",
+        ]
+        
+        results = self.scorer.find_similar(prompts, threshold=0.65)
+        found = {(r['index1'], r['index2']): r['similarity_score'] for r in results}
+        
+        expected = {}
+        for i in range(len(prompts)):
+            for j in range(i + 1, len(prompts)):
+                score = self.scorer.compare(prompts[i], prompts[j])['similarity_score']
+                if score >= 0.65:
+                    expected[(i, j)] = score
+        
+        assert found == expected
+    
+    def test_find_similar_scores_only(self):
+        """Test that scores_only returns index/score tuples matching the reports."""
+        prompts = [
+            "Write a story about dragons.",
+            "Create a tale about knights.",
+            "Extract email addresses from text.",
+        ]
+        
+        reports = self.scorer.find_similar(prompts, threshold=0.3)
+        scores = self.scorer.find_similar(prompts, threshold=0.3, scores_only=True)
+        
+        assert scores == [(r['index1'], r['index2'], r['similarity_score']) for r in reports]
+    
+    def test_find_similar_parallel(self):
+        """Test that parallel scoring returns the same pairs as serial scoring."""
+        prompts = [
+            "You are a helpful AI assistant. Answer questions clearly.",
+            "Act as a helpful assistant. Provide clear answers.",
+            "Write a poem about nature in the style of Robert Frost.",
+            "Generate a nature poem inspired by Robert Frost.",
+        ]
+        
+        serial = self.scorer.find_similar(prompts, threshold=0.5)
+        parallel = self.scorer.find_similar(prompts, threshold=0.5, n_jobs=2, chunk_size=2)
+        
+        assert [(r['index1'], r['index2'], r['similarity_score']) for r in parallel] == \
+            [(r['index1'], r['index2'], r['similarity_score']) for r in serial]
+    
+    def test_preprocess_cache(self):
+        """Test that repeated prompts reuse cached features."""
+        text = "You are a helpful assistant. Always answer clearly."
+        
+        first = self.scorer.preprocess(text)
+        
+        assert self.scorer.preprocess(text) is first
+        assert self.scorer.preprocess(text, {"type": "dataset"}) is not first
+        assert self.scorer.preprocess(text, {"tags": ["a"]}).canonical["type"] == "prompt"
+        
+        self.scorer.clear_cache()
+        
+        assert self.scorer.preprocess(text) is not first
+        assert self.scorer.preprocess(text) == first
+    
+    def test_report_details_are_copies(self):
+        """Test that mutating a report does not change later reports."""
+        text1 = "You are Sheldon Cooper. Always say Bazinga after a joke."
+        text2 = "Act as a helpful assistant. Provide clear answers."
+        
+        expected = deepcopy(self.scorer.compare(text1, text2))
+        report = self.scorer.compare(text1, text2)
+        report['details']['canonical1']['roles'].append('mutated')
+        report['details']['tags1']['primary_tags'].append('mutated')
+        report['details']['canonical2']['metadata']['length'] = 'mutated'
+        
+        assert self.scorer.compare(text1, text2) == expected
+        assert self.scorer.compare(text2, text1)['details']['canonical2'] == expected['details']['canonical1']
+    
+    def test_compare_vectors_matches_fingerprints(self):
+        """Test that fingerprint vectors compare like the fingerprints themselves."""
+        fingerprinter = self.scorer.fingerprinter
+        fp1 = self.scorer.preprocess("You are a pirate. Never break character. Always say arr.").fingerprint
+        fp2 = self.scorer.preprocess("Write a list:\n- one\n- two").fingerprint
+        
+        for a, b in [(fp1, fp1), (fp1, fp2), (fp2, fp1)]:
+            assert fingerprinter.compare_vectors(fingerprinter.to_vector(a), fingerprinter.to_vector(b)) == \
+                fingerprinter.compare_fingerprints(a, b)
+        assert fingerprinter.compare_fingerprints(fp1, fp1) == 1.0
+    
+    def test_compare_threshold_short_circuit(self):
+        """Test that structurally distant pairs skip tagging under a threshold."""
+        text1 = "You are a pirate. Never break character. Always say arr. You must rhyme."
+        text2 = "hello"
+        
+        full = self.scorer.compare(text1, text2)
+        result = SimilarityScorer().compare(text1, text2, threshold=0.95)
+        
+        assert result['verdict'] == 'below_threshold'
+        assert full['similarity_score'] <= result['similarity_score'] < 0.95
+        assert self.scorer.compare(text1, text2, threshold=0.1) == full
+    
+    def test_compare_threshold_report_shape(self):
+        """Test that below-threshold reports have the keys and types of full reports."""
+        text1 = "You are a pirate. Never break character. Always say arr. You must rhyme."
+        text2 = "hello"
+        
+        for detail_level in ("full", "summary", "score"):
+            full = self.scorer.compare(text1, text2, detail_level=detail_level)
+            result = SimilarityScorer().compare(text1, text2, threshold=0.95,
+                                                detail_level=detail_level)
+            
+            assert result['verdict'] == 'below_threshold'
+            assert list(result) == list(full)
+            assert isinstance(result['similarity_score'], float)
+            assert set(result['breakdown']) == \
+                set(full['breakdown']) - {'tag_overlap'} | {'tag_overlap_bound'}
+            assert all(isinstance(value, float) for value in result['breakdown'].values())
+            if detail_level != "score":
+                assert result['explanation'].keys() == full['explanation'].keys()
+                assert result['explanation']['matched_tags'] == []
+            if detail_level == "full":
+                assert result['details'].keys() == full['details'].keys()
+    
+    def test_threshold_compare_reuses_structure(self):
+        """Test that below-threshold comparisons canonicalize each prompt once."""
+        calls = []
+        canonicalize = self.scorer.canonicalizer.canonicalize
+        self.scorer.canonicalizer.canonicalize = lambda text, metadata=None: (
+            calls.append(text) or canonicalize(text, metadata)
+        )
+        text1 = "Write a story about dragons."
+        text2 = "Extract email addresses from text. Format as JSON."
+        
+        first = self.scorer.compare(text1, text2, threshold=0.99)
+        second = self.scorer.compare(text2, text1, threshold=0.99)
+        
+        assert first['verdict'] == second['verdict'] == 'below_threshold'
+        assert sorted(calls) == sorted([text1, text2])
+    
+    def test_batch_compare_parallel(self):
+        """Test that parallel, chunked comparison gives the same batch results."""
+        texts = [
+            "You are a helpful AI assistant. Answer questions clearly.",
+            "Act as a helpful assistant. Provide clear answers.",
+            "Write a poem about nature in the style of Robert Frost.",
+            "Generate a nature poem inspired by Robert Frost.",
+        ] * 30
+        prompts = list(zip(texts, reversed(texts)))
+        
+        serial = SimilarityScorer().batch_compare(prompts, threshold=0.5)
+        parallel = SimilarityScorer().batch_compare(prompts, threshold=0.5, n_jobs=2)
+        chunked = SimilarityScorer().batch_compare(prompts, threshold=0.5, n_jobs=2, chunk_size=7)
+        
+        assert [(r['pair_index'], r['similarity_score']) for r in parallel] == \
+            [(r['pair_index'], r['similarity_score']) for r in serial]
+        assert chunked == serial
+        assert SimilarityScorer().preprocess_many(texts, n_jobs=2, chunk_size=1) == \
+            [self.scorer.preprocess(text) for text in texts]
+    
+    def test_preprocess_many_larger_than_cache(self, monkeypatch):
+        """Test that texts evicted from a small cache are not preprocessed again."""
+        texts = [f"Write a poem about topic number {k}." for k in range(6)]
+        expected = [self.scorer.preprocess(text) for text in texts]
+        calls = []
+        preprocess = SimilarityScorer._preprocess
+        monkeypatch.setattr(SimilarityScorer, "_preprocess", lambda self, *args: (
+            calls.append(os.getpid()) or preprocess(self, *args)
+        ))
+        
+        for n_jobs in (1, 2):
+            scorer = SimilarityScorer()
+            scorer.PREPROCESS_CACHE_SIZE = 2
+            del calls[:]
+            
+            assert scorer.preprocess_many(texts + texts, n_jobs=n_jobs, chunk_size=2) == expected * 2
+            assert len(calls) == (len(texts) if n_jobs == 1 else 0)
+            assert len(scorer._preprocess_cache) == 2
+    
+    def test_compare_tag_masks_matches_sets(self):
+        """Test that mask-based tag comparison matches the set-based one."""
+        tagger = self.scorer.tagger
+        tags = [
+            self.scorer.preprocess(text).tags
+            for text in [
+                "You are Sheldon Cooper. Always say Bazinga.",
+                "Write a poem about nature.",
+                "Extract all dates from text.",
+            ]
+        ]
+        
+        for tags1 in tags:
+            for tags2 in tags:
+                similarity, matched_mask = tagger.compare_tag_masks(tagger.tag_masks(tags1), tagger.tag_masks(tags2))
+                expected_similarity, expected_matched = tagger.compare_tags(tags1, tags2)
+                
+                assert similarity == expected_similarity
+                assert sorted(tagger.mask_tags(matched_mask)) == sorted(expected_matched)
+    
+    def test_detail_levels(self):
+        """Test that lower detail levels omit parts of the full report."""
+        text1 = "You are a helpful AI assistant. Answer questions clearly."
+        text2 = "Act as a helpful assistant. Provide clear answers."
+        
+        full = self.scorer.compare(text1, text2)
+        summary = self.scorer.compare(text1, text2, detail_level="summary")
+        score = self.scorer.compare(text1, text2, detail_level="score")
+        
+        assert summary == {k: v for k, v in full.items() if k != 'details'}
+        assert score == {k: full[k] for k in ('similarity_score', 'breakdown', 'verdict')}
+        assert 'details' not in self.scorer.batch_compare([(text1, text2)], threshold=0.0)[0]
+    
+    def test_similarity_matrix_matches_compare(self):
+        """Test that similarity_matrix scores every cross pair like compare."""
+        prompts_a = [
+            "You are a helpful AI assistant. Answer questions clearly.",
+            "Write a poem about nature in the style of Robert Frost.",
+        ]
+        prompts_b = [
+            "Act as a helpful assistant. Provide clear answers.",
+            "Generate a nature poem inspired by Robert Frost.",
+            "Extract all dates from text and format as YYYY-MM-DD.",
+        ]
+        
+        scores = self.scorer.similarity_matrix(prompts_a, prompts_b)
+        
+        assert scores == [
+            [self.scorer.compare(a, b)['similarity_score'] for b in prompts_b]
+            for a in prompts_a
+        ]
@@ -0,0 +1,200 @@
+"""
+Test suite for shared utilities.
+"""
+
+from array import array
+import math
+import subprocess
+import sys
+
+import pytest
+from iif._kernels import _cosine_loop
+from iif.utils import (
+    KeywordMatcher, cosine_similarity, cosine_similarity_matrix, extract_keywords,
+    jaccard_bitset, jaccard_similarity, load_vocabulary, normalize_keywords,
+    to_bitset
+)
+
+
+class TestKeywordMatcher:
+    
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.keywords = ["Bazinga", "physics", "string theory", "train"]
+        self.matcher = KeywordMatcher(self.keywords)
+    
+    def test_matches_extract_keywords(self):
+        """Test that matches agree with extract_keywords."""
+        text = "Explain  String Theory, then say BAZINGA on the trains."
+        expected = {k.lower() for k in extract_keywords(text, self.keywords)}
+        
+        assert self.matcher.find("explain string theory, then say bazinga on the trains.") == expected
+    
+    def test_extract_keywords_keeps_order(self):
+        """Test that extract_keywords returns the given keywords in list order."""
+        keywords = ["User:", "you are", "missing", "user:", "you are"]
+        
+        found = extract_keywords("You  are a bot.\nUSER: hi", keywords)
+        
+        assert found == ["User:", "you are", "user:", "you are"]
+    
+    def test_substring_matches(self):
+        """Test that keywords inside longer words are found."""
+        assert self.matcher.find("astrophysics") == {"physics"}
+    
+    def test_no_matches(self):
+        """Test text without any keyword."""
+        assert self.matcher.find("hello world") == set()
+    
+    def test_deduplicates_keywords(self):
+        """Test that normalized duplicates are kept once."""
+        matcher = KeywordMatcher(["Physics", "physics ", "train"])
+        
+        assert matcher.keywords == ["physics", "train"]
+    
+    def test_exact_keywords(self):
+        """Test that normalize=False keeps keywords as given."""
+        matcher = KeywordMatcher(["Q:", "user:"], normalize=False)
+        
+        assert matcher.keywords == ["Q:", "user:"]
+        assert matcher.find("q: hi user: hello") == {"user:"}
+
+
+class TestLoadVocabulary:
+    
+    def test_cached(self):
+        """Test that repeated loads reuse the parsed vocabulary."""
+        first = load_vocabulary("intent_tags")
+        
+        assert "roleplay" in first
+        assert load_vocabulary("intent_tags") is first
+    
+    def test_normalize_keywords(self):
+        """Test that keyword lists are normalized in order."""
+        assert normalize_keywords(("You  Are", "USER:")) == ("you are", "user:")
+    
+    def test_missing_vocabulary(self):
+        """Test that unknown vocabularies raise FileNotFoundError."""
+        with pytest.raises(FileNotFoundError):
+            load_vocabulary("does_not_exist")
+
+
+class TestSimilarityFunctions:
+    
+    def test_cosine_similarity(self):
+        """Test cosine similarity of plain vectors."""
+        assert cosine_similarity([1.0, 0.0], [0.0, 2.0]) == 0.0
+        assert cosine_similarity([1.0, 2.0], [2.0, 4.0]) == pytest.approx(1.0)
+        assert cosine_similarity([1.0, 1.0], [-1.0, -1.0]) == pytest.approx(-1.0)
+        assert cosine_similarity([0.0, 0.0], [1.0, 1.0]) == 0.0
+    
+    def test_cosine_similarity_tiny_vectors(self):
+        """Test that tiny nonzero vectors do not underflow the norm product."""
+        vec1, vec2 = [1e-100, 1e-100], [1e-100, 2e-100]
+        expected = 3 / math.sqrt(10)
+        
+        assert cosine_similarity(vec1, vec2) == pytest.approx(expected)
+        assert _cosine_loop(memoryview(array("d", vec1)),
+                            memoryview(array("d", vec2))) == pytest.approx(expected)
+        
+        _csim = pytest.importorskip("iif._csim")
+        assert _csim.cosine(array("d", vec1), array("d", vec2)) == pytest.approx(expected)
+    
+    def test_cosine_similarity_matrix(self):
+        """Test that the matrix form matches pairwise cosine similarity."""
+        rows1 = [[1.0, 2.0], [0.0, 0.0]]
+        rows2 = [[2.0, 4.0], [1.0, -1.0], [0.0, 3.0]]
+        
+        matrix = cosine_similarity_matrix(rows1, rows2)
+        
+        for vector1, row in zip(rows1, matrix):
+            for vector2, score in zip(rows2, row):
+                assert score == pytest.approx(cosine_similarity(vector1, vector2))
+    
+    def test_cosine_similarity_matrix_ragged_rows(self):
+        """Test that a row of another length raises like cosine_similarity."""
+        with pytest.raises(ValueError):
+            cosine_similarity_matrix([[1.0, 2.0], [1.0, 2.0, 3.0]], [[2.0, 4.0]])
+        with pytest.raises(ValueError):
+            cosine_similarity_matrix([[1.0, 2.0]], [[2.0, 4.0], [1.0]])
+        assert cosine_similarity_matrix([], [[1.0]]) == []
+    
+    def test_cosine_similarity_matrix_half_precision(self):
+        """Test that float16 storage stays close to float32 scores."""
+        np = pytest.importorskip("numpy")
+        rng = np.random.default_rng(0)
+        rows1, rows2 = rng.standard_normal((4, 64)), rng.standard_normal((5, 64))
+        
+        full = cosine_similarity_matrix(rows1, rows2)
+        half = cosine_similarity_matrix(rows1, rows2, dtype=np.float16)
+        
+        assert half.dtype == np.float32
+        assert np.abs(full - half).max() < 1e-2
+    
+    def test_cosine_similarity_length_mismatch(self):
+        """Test that vectors of different lengths are rejected."""
+        with pytest.raises(ValueError):
+            cosine_similarity([1.0], [1.0, 2.0])
+    
+    def test_jaccard_bitset_matches_sets(self):
+        """Test that bitset Jaccard agrees with set Jaccard."""
+        index = {}
+        cases = [({"a", "b", "c"}, {"b", "c", "d"}), ({"a"}, {"b"}), (set(), set()), ({"a"}, set())]
+        
+        for set1, set2 in cases:
+            mask1, mask2 = to_bitset(set1, index), to_bitset(set2, index)
+            assert jaccard_bitset(mask1, mask2) == jaccard_similarity(set1, set2)
+            assert jaccard_similarity(mask1, mask2) == jaccard_similarity(set1, set2)
+        
+        assert sorted(index) == ["a", "b", "c", "d"]
+    
+    def test_jaccard_frozensets(self):
+        """Test that memoized frozenset Jaccard matches the set version."""
+        cases = [({"a", "b", "c"}, {"b", "c", "d"}), (set(), set()), ({"a"}, set())]
+        
+        for set1, set2 in cases:
+            expected = jaccard_similarity(set1, set2)
+            assert jaccard_similarity(frozenset(set1), frozenset(set2)) == expected
+            assert jaccard_similarity(frozenset(set1), frozenset(set2)) == expected
+    
+    def test_jaccard_threshold(self):
+        """Test that size-ruled-out pairs score 0.0 and others are unaffected."""
+        small, large = {"a"}, {"a", "b", "c", "d"}
+        
+        assert jaccard_similarity(small, large) == 0.25
+        assert jaccard_similarity(small, large, threshold=0.5) == 0.0
+        assert jaccard_similarity(small, large, threshold=0.25) == 0.25
+        assert jaccard_similarity(set(), set(), threshold=0.5) == 1.0
+    
+    def test_compiled_cosine_matches(self):
+        """Test that the optional C kernel agrees with the pure-Python path."""
+        _csim = pytest.importorskip("iif._csim")
+        vec1, vec2 = [1.0, 2.0, 3.0], [2.0, 0.0, 1.0]
+        
+        for typecode in ("f", "d"):
+            score = _csim.cosine(array(typecode, vec1), array(typecode, vec2))
+            assert score == pytest.approx(cosine_similarity(vec1, vec2))
+        
+        assert _csim.cosine(array("d", [1.0, 2.0]), array("d", [0.0, 0.0])) == 0.0
+        with pytest.raises(TypeError):
+            _csim.cosine(array("f", vec1), array("d", vec2))
+    
+    def test_import_skips_numeric_dependencies(self):
+        """Test that importing iif does not import numpy or numba."""
+        code = "import sys, iif; print('numpy' in sys.modules or 'numba' in sys.modules)"
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True,
+                                text=True, check=True).stdout
+        
+        assert output.strip() == "False"
+    
+    def test_numba_cosine_keeps_float64(self):
+        """Test that the numba kernel computes float64 input in float64."""
+        pytest.importorskip("numba")
+        np = pytest.importorskip("numpy")
+        from iif import _kernels
+        rng = np.random.default_rng(0)
+        vec1, vec2 = rng.standard_normal(100), rng.standard_normal(100)
+        expected = vec1.dot(vec2) / np.sqrt(vec1.dot(vec1) * vec2.dot(vec2))
+        
+        assert _kernels._compiled_loop()(vec1, vec2) == pytest.approx(expected, rel=1e-12)
+        assert _kernels.cosine(vec1.astype(np.int64), vec2.astype(np.int64)) is None